@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+
+from config_setup import cfg
+
+_loop = None
+_loopLock = threading.Lock()
+# (api key, base url) -> AsyncOpenAI, each keeps its own connection pool
+_clients = {}
+# identical requests in flight share one call
+_inflight = {}
+
+
+def _serviceLoop():
+    """
+    Event loop on a daemon thread that owns the shared clients. The Qt loop,
+    report workers and anything else hand their requests to it, so every
+    request reuses the same pooled connections.
+    """
+    global _loop
+    with _loopLock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="openai", daemon=True
+            ).start()
+            _loop = loop
+    return _loop
+
+
+def settings():
+    """(api key, base url); OPENAI_API_KEY / OPENAI_BASE_URL fill in blanks"""
+    apiKey = cfg.openai_key.value or os.environ.get("OPENAI_API_KEY") or None
+    baseUrl = cfg.openai_base_url.value or os.environ.get("OPENAI_BASE_URL") or None
+    return apiKey, baseUrl
+
+
+def configured():
+    return settings()[0] is not None
+
+
+def getClient():
+    """Shared client for the current settings, only use it on the service loop"""
+    key = settings()
+    client = _clients.get(key)
+    if client is None:
+        from openai import AsyncOpenAI  # slow import, first request only
+
+        client = _clients[key] = AsyncOpenAI(api_key=key[0], base_url=key[1])
+    return client
+
+
+def submit(coro):
+    """Run `coro` on the service loop, returns a concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, _serviceLoop())
+
+
+def runSync(coro):
+    """Blocking, for worker threads"""
+    return submit(coro).result()
+
+
+async def runAsync(coro):
+    """Awaitable from any other event loop, e.g. the qasync one"""
+    return await asyncio.wrap_future(submit(coro))
+
+
+async def createResponse(client=None, **request):
+    """
+    client.responses.create, but a request identical to one still in flight
+    waits for that one instead. Runs on the loop that owns `client` (the
+    service loop for the shared one).
+    """
+    client = client or getClient()
+    digest = hashlib.sha256(
+        json.dumps(request, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    key = (id(client), digest)
+
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(client.responses.create(**request))
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # a cancelled waiter must not cancel the call the others are waiting on
+    return await asyncio.shield(future)
+
+
+async def respond(**request):
+    """Text of a response from the shared client, awaitable from any loop"""
+    response = await runAsync(createResponse(**request))
+    return response.output_text
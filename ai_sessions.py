@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import random
+
+import openai
+
+import ai_client
+
+log = logging.getLogger(__name__)
+
+MODEL = "gpt-4o-mini"
+
+# rough prompt size per request, prompt_def.md itself is ~1k tokens
+CHUNK_TOKENS = 6000
+MAX_CONCURRENCY = 4
+MAX_ATTEMPTS = 4
+REASK_ROUNDS = 2
+# every session prompt starts with prompt_def.md, route them to the same cache
+PROMPT_CACHE_KEY = "savecodex-sessions"
+
+RETRYABLE = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+def estimateTokens(text):
+    # ~4 characters per token is close enough for budgeting
+    return len(text) // 4 + 1
+
+
+def chunkFiles(filenameCodeDict, budget=None):
+    """Group files into prompts of at most `budget` tokens, keeping sort order"""
+    budget = budget or CHUNK_TOKENS
+    chunks, current, used = [], {}, 0
+    for fileName, code in filenameCodeDict.items():
+        cost = estimateTokens(code) + estimateTokens(fileName) * 2 + 8
+        if current and used + cost > budget:
+            chunks.append(current)
+            current, used = {}, 0
+        current[fileName] = code
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def parseReply(text, expected):
+    """
+    Pull the JSON object out of a model reply and keep only well formed
+    entries. Returns (sessions, failed) where failed lists the files that are
+    missing or invalid and need to be asked again.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return {}, list(expected)
+    if not isinstance(data, dict):
+        return {}, list(expected)
+
+    sessions, failed = {}, []
+    for fileName in expected:
+        inputs = data.get(fileName)
+        if isinstance(inputs, list) and all(isinstance(i, str) for i in inputs):
+            sessions[fileName] = inputs
+        else:
+            failed.append(fileName)
+    return sessions, failed
+
+
+async def _askChunk(client, extension, chunk, semaphore, buildPrompt):
+    prompt = buildPrompt(extension, chunk)
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            async with semaphore:
+                res = await ai_client.createResponse(
+                    client,
+                    model=MODEL,
+                    input=prompt,
+                    prompt_cache_key=PROMPT_CACHE_KEY,
+                )
+            return parseReply(res.output_text, chunk)
+        except RETRYABLE as e:
+            if attempt == MAX_ATTEMPTS - 1:
+                log.warning("Giving up on %s: %s", list(chunk), e)
+                return {}, list(chunk)
+            await asyncio.sleep(0.5 * 2**attempt + random.random() * 0.25)
+        except openai.APIError as e:
+            # auth, bad request and the like fail the same way every time, the
+            # chunk's files run without input instead of failing the report
+            log.warning("No input sessions for %s: %s", list(chunk), e)
+            return {}, []
+
+
+async def generateSessions(client, extension, filenameCodeDict, buildPrompt):
+    """
+    Ask the model for input sessions, a few files per request, all requests in
+    flight at once. Files whose part of a reply is broken are asked again on
+    their own; whatever still fails after that, or hits an API error that
+    retrying can't fix, is left out of the result.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    sessions = {}
+    pending = dict(filenameCodeDict)
+
+    for reask in range(REASK_ROUNDS + 1):
+        if not pending:
+            break
+        # first round batches, re-asks go one file per request
+        chunks = (
+            chunkFiles(pending) if reask == 0 else [{f: c} for f, c in pending.items()]
+        )
+        results = await asyncio.gather(
+            *(
+                _askChunk(client, extension, chunk, semaphore, buildPrompt)
+                for chunk in chunks
+            )
+        )
+
+        failed = []
+        for got, bad in results:
+            sessions.update(got)
+            failed += bad
+        pending = {fileName: filenameCodeDict[fileName] for fileName in failed}
+
+    for fileName in pending:
+        log.warning(
+            "No valid input sessions for %s, running it without input", fileName
+        )
+
+    return {f: sessions[f] for f in filenameCodeDict if f in sessions}
+
+
+def generateSessionsSync(extension, filenameCodeDict, buildPrompt, client=None):
+    """
+    Blocking wrapper for worker threads. Requests go through the shared
+    ai_client connection pool, unless a ready made async `client` (e.g. a stub
+    object) is passed, which then runs on its own loop.
+    """
+    if client is not None:
+        return asyncio.run(
+            generateSessions(client, extension, filenameCodeDict, buildPrompt)
+        )
+    return ai_client.runSync(
+        generateSessions(
+            ai_client.getClient(), extension, filenameCodeDict, buildPrompt
+        )
+    )
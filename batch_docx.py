@@ -0,0 +1,191 @@
+"""
+Generate DOCX reports for many folders without the UI.
+
+    python batch_docx.py "labs/week*" --language C --heading "Week $s"
+    python batch_docx.py labs/week1 labs/week2 --workers 2 --full
+
+Folders are processed in parallel and share the compile/run worker pools, the
+build cache, the input session cache and the OpenAI connection pool.
+"""
+
+import argparse
+import glob
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import build
+import compile_docx
+import docx_writer
+import runner
+import scheduler
+import tracing
+from config_setup import cfg, inputCalls, language_names
+
+FOLDER_WORKERS = 4
+
+
+def expandFolders(patterns):
+    """Folders matching the arguments, globs expanded here for shells that don't"""
+    folders = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern), key=compile_docx.sort_key) or [pattern]
+        for match in matches:
+            if os.path.isdir(match) and match not in folders:
+                folders.append(match)
+            elif not os.path.isdir(match):
+                print(f"Skipping {match}, not a folder", file=sys.stderr)
+    return folders
+
+
+def findLanguage(name):
+    lang_conf = cfg.languageConfig(name)
+    if lang_conf:
+        return lang_conf
+    for candidate in language_names:
+        if candidate.lower() == name.lower():
+            return cfg.languageConfig(candidate)
+    return None
+
+
+def reportFolder(folder, lang_conf, args, pools, cancel):
+    """Generate one folder's report, returns a summary row"""
+    pathStr = os.path.abspath(folder).replace("\\", "/").rstrip("/") + "/"
+    tracer = tracing.Tracer()
+    start = time.perf_counter()
+    row = {"folder": folder, "files": 0, "reused": 0, "status": "ok", "error": ""}
+    try:
+        compile_docx.generateDocx(
+            pathStr,
+            extension=lang_conf["extension"],
+            compile_cmd=lang_conf["compile"],
+            run_cmd=lang_conf["run"],
+            page_break=args.page_break,
+            heading=args.heading,
+            paragraph=args.paragraph,
+            input_calls=inputCalls(lang_conf),
+            incremental=not args.full,
+            cancel=cancel,
+            tracer=tracer,
+            pools=pools,
+            writer=args.writer,
+            highlight=args.highlight,
+        )
+    except runner.Cancelled:
+        row["status"] = "cancelled"
+    except Exception as e:
+        row["status"] = "failed"
+        row["error"] = str(e)
+    row["seconds"] = time.perf_counter() - start
+
+    for span in tracer.spans:
+        if span["name"] == "list":
+            row["files"] = len(span["attrs"].get("files", []))
+        elif span["name"] == "docx" and span["attrs"].get("reused"):
+            row["reused"] += 1
+    if args.trace:
+        try:
+            compile_docx.saveTrace(pathStr, tracer, chrome=args.trace == "chrome")
+        except OSError as e:
+            print(f"Could not write trace for {folder}: {e}", file=sys.stderr)
+    return row
+
+
+def printSummary(rows, total):
+    width = max([len("Folder")] + [len(r["folder"]) for r in rows])
+    print(f"\n{'Folder':<{width}}  {'Files':>5}  {'Reused':>6}  {'Time':>8}  Status")
+    for r in rows:
+        status = r["status"] + (f": {r['error']}" if r["error"] else "")
+        print(
+            f"{r['folder']:<{width}}  {r['files']:>5}  {r['reused']:>6}  "
+            f"{r['seconds']:>7.2f}s  {status}"
+        )
+    busy = sum(r["seconds"] for r in rows)
+    print(f"\n{len(rows)} folders in {total:.2f}s ({busy:.2f}s of folder time)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        epilog="$s in the heading is replaced by the folder name.",
+    )
+    parser.add_argument("folders", nargs="+", help="folders or glob patterns")
+    parser.add_argument("--language", default=cfg.language.value)
+    parser.add_argument("--heading", default=cfg.heading.value)
+    parser.add_argument("--paragraph", default=cfg.paragraph.value)
+    parser.add_argument(
+        "--page-break",
+        action=argparse.BooleanOptionalAction,
+        default=cfg.pageBreak.value,
+    )
+    parser.add_argument("--workers", type=int, default=FOLDER_WORKERS)
+    parser.add_argument(
+        "--full", action="store_true", help="rerun every file, ignore the manifest"
+    )
+    parser.add_argument("--trace", choices=["jsonl", "chrome"])
+    parser.add_argument(
+        "--highlight",
+        action=argparse.BooleanOptionalAction,
+        default=cfg.highlightCode.value,
+    )
+    parser.add_argument(
+        "--writer", choices=docx_writer.WRITERS, default=cfg.docxWriter.value
+    )
+    parser.add_argument(
+        "--quiet", action="store_true", help="only progress and the summary"
+    )
+    args = parser.parse_args()
+
+    lang_conf = findLanguage(args.language)
+    if not lang_conf:
+        parser.error(f"unknown language {args.language!r}, one of: {language_names}")
+
+    folders = expandFolders(args.folders)
+    if not folders:
+        parser.error("no folders matched")
+
+    # pipeline messages go to stderr through logging, --quiet keeps only errors
+    logging.basicConfig(
+        level=logging.ERROR if args.quiet else logging.INFO,
+        format="%(message)s",
+        stream=sys.stderr,
+    )
+
+    cancel = threading.Event()
+    start = time.perf_counter()
+    rows = []
+    with build.compilePool() as compilePool, scheduler.runPool() as runPool, ThreadPoolExecutor(
+        max_workers=max(1, args.workers), thread_name_prefix="folder"
+    ) as folderPool:
+        futures = [
+            folderPool.submit(
+                reportFolder, folder, lang_conf, args, (compilePool, runPool), cancel
+            )
+            for folder in folders
+        ]
+        try:
+            for i, future in enumerate(futures, 1):
+                row = future.result()
+                rows.append(row)
+                print(
+                    f"[{i}/{len(folders)}] {row['folder']}: {row['status']} "
+                    f"in {row['seconds']:.2f}s",
+                    file=sys.stderr,
+                    flush=True,
+                )
+        except KeyboardInterrupt:
+            # running programs get killed, queued folders never start
+            cancel.set()
+            for future in futures:
+                future.cancel()
+            rows += [f.result() for f in futures[len(rows) :] if not f.cancelled()]
+
+    printSummary(rows, time.perf_counter() - start)
+    return 0 if all(r["status"] == "ok" for r in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+DOCX writer benchmark: python-docx against the streaming writer, with plain
+and syntax-highlighted code, on a synthetic report (long sources, a few output
+images per file). Nothing is compiled or run, only the document is built and
+saved.
+
+    python bench_docx.py
+    python bench_docx.py --files 300 --lines 200 --out bench_docx.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def makeSections(files, lines, images):
+    """[(fileName, code, [(pngBuffer, size), ...])] like generateDocx collects"""
+    import render
+
+    sections = []
+    for i in range(1, files + 1):
+        code = "#include <stdio.h>\n\nint main() {\n"
+        code += "".join(
+            f'\tprintf("line {n} of program {i}: %d\\n", {n} * {i});\n'
+            for n in range(lines)
+        )
+        code += "\treturn 0;\n}\n"
+
+        outputs = []
+        for session in range(images):
+            # a few outputs repeat between files, like programs without input
+            text = "".join(
+                f"line {n} of program {i % 10}: {n * session}\n" for n in range(20)
+            )
+            transcript = {"events": [(0, "stdout", text)], "status": "ok"}
+            outputs.append(render.renderTranscript(transcript))
+        sections.append((f"{i}.c", code, outputs))
+    return sections
+
+
+def buildReport(writer, savePath, sections, extension=None):
+    import compile_docx
+    import docx_writer
+
+    document = docx_writer.openWriter(writer, savePath)
+    document.addHeading("Benchmark", 1)
+    document.addParagraph("Synthetic report")
+    for fileName, code, images in sections:
+        # buffers are read by the writer, hand each run fresh ones
+        images = [(type(buf)(buf.getvalue()), size) for buf, size in images]
+        compile_docx.addSection(document, fileName, code, images, False, extension)
+    document.close()
+
+
+def measure(writer, folder, sections, runs, extension):
+    import highlight
+
+    savePath = os.path.join(folder, f"{writer}.docx")
+    times = []
+    for _ in range(runs):
+        # a fresh report tokenizes every file, later ones hit the memo
+        highlight._memo.clear()
+        start = time.perf_counter()
+        buildReport(writer, savePath, sections, extension)
+        times.append(time.perf_counter() - start)
+
+    # Python allocations only, python-docx's lxml tree lives outside of them
+    tracemalloc.start()
+    buildReport(writer, savePath, sections, extension)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "seconds": round(statistics.median(times), 4),
+        "runs": [round(t, 4) for t in times],
+        "peak_mb": round(peak / 2**20, 1),
+        "docx_kb": round(os.path.getsize(savePath) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=150)
+    parser.add_argument("--lines", type=int, default=120, help="lines per source")
+    parser.add_argument("--images", type=int, default=2, help="images per file")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--out", help="write the results as JSON")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    import docx_writer
+
+    # imports and the template load aren't part of the measurement
+    sections = makeSections(args.files, args.lines, args.images)
+    folder = tempfile.mkdtemp(prefix="savecodex-docx-")
+    try:
+        for writer in docx_writer.WRITERS:
+            buildReport(writer, os.path.join(folder, "warmup.docx"), sections[:1])
+        results = {}
+        for writer in docx_writer.WRITERS:
+            for extension, mode in ((None, "plain"), (".c", "highlighted")):
+                results[f"{writer} {mode}"] = measure(
+                    writer, folder, sections, args.runs, extension
+                )
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    print(f"{args.files} files, {args.lines} lines and {args.images} images each")
+    print(f"{'writer':>24} | {'time':>8} | {'py heap':>9} | {'size':>9}")
+    for name, r in results.items():
+        print(
+            f"{name:>24} | {r['seconds']:>7.3f}s | {r['peak_mb']:>6.1f} MB"
+            f" | {r['docx_kb']:>6.0f} KB"
+        )
+    for mode in ("plain", "highlighted"):
+        base = results[f"python-docx {mode}"]["seconds"]
+        stream = results[f"stream {mode}"]["seconds"]
+        if stream:
+            print(f"{mode}: stream is {base / stream:.1f}x faster")
+    for writer in docx_writer.WRITERS:
+        plain = results[f"{writer} plain"]["seconds"]
+        if plain:
+            factor = results[f"{writer} highlighted"]["seconds"] / plain
+            print(f"{writer}: highlighting costs {factor:.1f}x the plain build")
+
+    if args.out:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "files": args.files,
+            "lines": args.lines,
+            "images": args.images,
+            "results": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+"""
+Offline benchmark of the generateDocx pipeline.
+
+Builds synthetic lab folders (N files per language: no input, counted loop,
+sentinel loop), answers the model with a local stub and reports per-stage
+timings for a cold run, an unchanged rerun, a forced full rerun with warm
+caches and a rerun after editing one file.
+
+    python bench_pipeline.py --files 20 --out bench_output.json
+    python bench_pipeline.py --compare bench_output.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+TEMPLATES = {
+    "C": {
+        "plain": """#include <stdio.h>
+
+int main() {
+    int s = 0;
+    for (int i = 1; i <= 10; i++) {
+        s += i * i;
+    }
+    printf("Sum of squares: %d\\n", s);
+    return 0;
+}
+""",
+        "loop": """#include <stdio.h>
+
+int main() {
+    int n, x, s = 0;
+    printf("Enter n: ");
+    scanf("%d", &n);
+    for (int i = 0; i < n; i++) {
+        printf("Enter number %d: ", i + 1);
+        scanf("%d", &x);
+        s += x;
+    }
+    printf("Sum = %d\\n", s);
+    return 0;
+}
+""",
+        "sentinel": """#include <stdio.h>
+
+int main() {
+    int x, count = 0;
+    while (1) {
+        printf("Enter a number (0 to stop): ");
+        scanf("%d", &x);
+        if (x == 0) {
+            break;
+        }
+        count++;
+    }
+    printf("You entered %d numbers\\n", count);
+    return 0;
+}
+""",
+    },
+    "C++": {
+        "plain": """#include <iostream>
+using namespace std;
+
+int main() {
+    long f = 1;
+    for (int i = 1; i <= 10; i++) {
+        f *= i;
+    }
+    cout << "10! = " << f << endl;
+    return 0;
+}
+""",
+        "loop": """#include <iostream>
+using namespace std;
+
+int main() {
+    int n, x, s = 0;
+    cout << "Enter n: ";
+    cin >> n;
+    for (int i = 0; i < n; i++) {
+        cout << "Enter number " << i + 1 << ": ";
+        cin >> x;
+        s += x;
+    }
+    cout << "Sum = " << s << endl;
+    return 0;
+}
+""",
+        "sentinel": """#include <iostream>
+using namespace std;
+
+int main() {
+    int x, count = 0;
+    while (true) {
+        cout << "Enter a number (0 to stop): ";
+        cin >> x;
+        if (x == 0) {
+            break;
+        }
+        count++;
+    }
+    cout << "You entered " << count << " numbers" << endl;
+    return 0;
+}
+""",
+    },
+    "Python": {
+        "plain": """total = 0
+for i in range(1, 11):
+    total += i * i
+print("Sum of squares:", total)
+""",
+        "loop": """n = int(input("Enter n: "))
+s = 0
+for i in range(n):
+    s += int(input(f"Enter number {i + 1}: "))
+print("Sum =", s)
+""",
+        "sentinel": """count = 0
+while True:
+    x = int(input("Enter a number (0 to stop): "))
+    if x == 0:
+        break
+    count += 1
+print("You entered", count, "numbers")
+""",
+    },
+    "JavaScript": {
+        "plain": """let total = 0;
+for (let i = 1; i <= 10; i++) {
+    total += i * i;
+}
+console.log("Sum of squares:", total);
+""",
+        "loop": """const readline = require("readline");
+const rl = readline.createInterface({ input: process.stdin });
+let n = null, s = 0, seen = 0;
+rl.on("line", (line) => {
+    if (n === null) {
+        n = parseInt(line);
+    } else {
+        s += parseInt(line);
+        seen++;
+    }
+    if (n !== null && seen === n) {
+        console.log("Sum =", s);
+        rl.close();
+    }
+});
+""",
+        "sentinel": """const readline = require("readline");
+const rl = readline.createInterface({ input: process.stdin });
+let count = 0;
+rl.on("line", (line) => {
+    if (parseInt(line) === 0) {
+        console.log("You entered", count, "numbers");
+        rl.close();
+    } else {
+        count++;
+    }
+});
+""",
+    },
+    "Rust": {
+        "plain": """fn main() {
+    let mut total = 0;
+    for i in 1..=10 {
+        total += i * i;
+    }
+    println!("Sum of squares: {}", total);
+}
+""",
+        "loop": """use std::io;
+
+fn read() -> i32 {
+    let mut line = String::new();
+    io::stdin().read_line(&mut line).unwrap();
+    line.trim().parse().unwrap_or(0)
+}
+
+fn main() {
+    let n = read();
+    let mut s = 0;
+    for _ in 0..n {
+        let mut line = String::new();
+        io::stdin().read_line(&mut line).unwrap();
+        s += line.trim().parse::<i32>().unwrap_or(0);
+    }
+    println!("Sum = {}", s);
+}
+""",
+        "sentinel": """use std::io;
+
+fn main() {
+    let mut count = 0;
+    loop {
+        let mut line = String::new();
+        io::stdin().read_line(&mut line).unwrap();
+        if line.trim() == "0" || line.is_empty() {
+            break;
+        }
+        count += 1;
+    }
+    println!("You entered {} numbers", count);
+}
+""",
+    },
+}
+
+KINDS = ["plain", "loop", "sentinel"]
+SESSIONS = {
+    "plain": [],
+    "loop": ["3\n4\n5\n6\n", "1\n42\n"],
+    "sentinel": ["5\n7\n0\n"],
+}
+
+
+class StubClient:
+    """Stands in for AsyncOpenAI, answers from the known synthetic sessions"""
+
+    def __init__(self, kinds, latency):
+        self.kinds = kinds
+        self.latency = latency
+        self.requests = 0
+        self.responses = self
+
+    async def create(self, model, input, **kwargs):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        files = re.findall(r"^(\S+) END$", input, re.M)
+        reply = {f: SESSIONS[self.kinds.get(f, "plain")] for f in files}
+        return SimpleNamespace(output_text=json.dumps(reply))
+
+
+def available(lang_conf):
+    """Whether the toolchain of a language is installed here"""
+    for template in (lang_conf["compile"], lang_conf["run"]):
+        words = template.split()
+        if words and not words[0].startswith('"$s') and not shutil.which(words[0]):
+            return False
+    return True
+
+
+def makeFolder(root, lang_conf, files):
+    folder = os.path.join(root, lang_conf["name"].replace("+", "p").replace("#", "s"))
+    os.makedirs(folder)
+    kinds = {}
+    for i in range(1, files + 1):
+        kind = KINDS[i % len(KINDS)]
+        fileName = f"{i}{lang_conf['extension']}"
+        with open(os.path.join(folder, fileName), "w", encoding="utf-8") as f:
+            comment = "#" if lang_conf["name"] == "Python" else "//"
+            # distinct sources, otherwise the build cache makes every file a hit
+            f.write(f"{comment} lab program {i}\n")
+            f.write(TEMPLATES[lang_conf["name"]][kind])
+        kinds[fileName] = kind
+    return folder + "/", kinds
+
+
+def runOnce(compile_docx, tracing, folder, lang_conf, kinds, latency, incremental):
+    tracer = tracing.Tracer()
+    client = StubClient(kinds, latency)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        savePath = compile_docx.generateDocx(
+            folder,
+            extension=lang_conf["extension"],
+            compile_cmd=lang_conf["compile"],
+            run_cmd=lang_conf["run"],
+            heading="Benchmark",
+            paragraph="Synthetic lab folder",
+            input_calls=lang_conf.get("input_calls"),
+            incremental=incremental,
+            client=client,
+            tracer=tracer,
+        )
+    stages = {name: round(value, 4) for name, value in sorted(tracer.totals().items())}
+    return {
+        "wall": round(time.perf_counter() - start, 4),
+        "stages": stages,
+        "llm_requests": client.requests,
+        "docx_kb": round(os.path.getsize(savePath) / 1024, 1),
+    }
+
+
+def gitCommit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+        )
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def printTable(results):
+    stages = sorted(
+        {s for r in results for p in r["passes"].values() for s in p["stages"]}
+    )
+    header = ["language", "pass", "wall", "docx kb"] + stages
+    print(" | ".join(f"{h:>10}" for h in header))
+    for r in results:
+        for name, p in r["passes"].items():
+            row = [r["language"], name, f"{p['wall']:.3f}", p.get("docx_kb", "")]
+            row += [f"{p['stages'].get(s, 0):.3f}" for s in stages]
+            print(" | ".join(f"{c:>10}" for c in row))
+
+
+def compare(old, new):
+    print(f"\nCompared to {old.get('commit')}:")
+    oldPasses = {
+        (r["language"], n): p for r in old["results"] for n, p in r["passes"].items()
+    }
+    for r in new["results"]:
+        for name, p in r["passes"].items():
+            before = oldPasses.get((r["language"], name))
+            if before:
+                change = (
+                    (p["wall"] - before["wall"]) / before["wall"] * 100
+                    if before["wall"]
+                    else 0
+                )
+                print(
+                    f"  {r['language']:>10} {name:>8}: {before['wall']:.3f}s -> {p['wall']:.3f}s ({change:+.1f}%)"
+                )
+                if "docx_kb" in before and "docx_kb" in p:
+                    print(
+                        f"  {'':>10} {'':>8}  docx {before['docx_kb']}kb -> {p['docx_kb']}kb"
+                    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=12, help="files per language")
+    parser.add_argument("--languages", nargs="*", help="default: every installed one")
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.3, help="stub reply delay"
+    )
+    parser.add_argument("--out", default="bench_output.json")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="savecodex-bench-")
+    # keep the user's build and session caches out of the measurement
+    os.environ["XDG_CACHE_HOME"] = os.path.join(root, "cache")
+    os.environ["LOCALAPPDATA"] = os.path.join(root, "cache")
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import compile_docx
+    import tracing
+    from config_setup import languages_data
+
+    results = []
+    try:
+        for lang_conf in languages_data:
+            name = lang_conf["name"]
+            if name not in TEMPLATES or (args.languages and name not in args.languages):
+                continue
+            if not available(lang_conf):
+                print(f"Skipping {name}, toolchain not installed")
+                continue
+
+            folder, kinds = makeFolder(root, lang_conf, args.files)
+            passes = {}
+            bench = (compile_docx, tracing, folder, lang_conf, kinds, args.llm_latency)
+            # fresh folder and caches, then everything reused from the manifest
+            passes["cold"] = runOnce(*bench, incremental=True)
+            passes["warm"] = runOnce(*bench, incremental=True)
+            # caches warm but every section rerun
+            passes["rerun"] = runOnce(*bench, incremental=False)
+
+            with open(
+                os.path.join(folder, f"1{lang_conf['extension']}"),
+                "a",
+                encoding="utf-8",
+            ) as f:
+                f.write("\n")
+            passes["edit-one"] = runOnce(*bench, incremental=True)
+
+            results.append({"language": name, "files": args.files, "passes": passes})
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "commit": gitCommit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    printTable(results)
+
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Startup benchmark: import profile of the UI modules (python -X importtime) and
+wall time from launch until the main window is shown.
+
+    python bench_startup.py
+    python bench_startup.py --exe dist/main.exe --out startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# modules that should only load once a feature is used
+LAZY_MODULES = ["openai", "docx", "PIL", "scheduler", "ai_sessions"]
+
+
+def _env():
+    env = dict(os.environ, SAVECODEX_EXIT_AFTER_SHOW="1")
+    if os.name != "nt" and not env.get("DISPLAY") and not env.get("WAYLAND_DISPLAY"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def importProfile():
+    """{module: (self µs, cumulative µs)} for a cold `import main_window`"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main_window"],
+        cwd=ROOT,
+        env=_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            selfTime, cumulative, name = line[len("import time:") :].split("|")
+            modules[name.strip()] = (int(selfTime), int(cumulative))
+        except ValueError:
+            continue  # the header line
+    return modules
+
+
+def timeToWindow(command, runs):
+    """Median seconds from spawning `command` until it exits right after show()"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            command,
+            cwd=ROOT,
+            env=_env(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports shown")
+    parser.add_argument("--exe", help="also time a PyInstaller build")
+    parser.add_argument("--out", help="write the results as JSON")
+    args = parser.parse_args()
+
+    modules = importProfile()
+    total = modules.get("main_window", (0, 0))[1] / 1e6
+    print(f"import main_window: {total:.3f}s")
+    print("slowest imports (cumulative):")
+    for name, (_, cumulative) in sorted(
+        modules.items(), key=lambda m: m[1][1], reverse=True
+    )[: args.top]:
+        print(f"  {cumulative / 1e6:8.3f}s  {name}")
+
+    eager = [m for m in LAZY_MODULES if m in modules]
+    if eager:
+        print(f"loaded at startup but meant to be lazy: {', '.join(eager)}")
+
+    median, runs = timeToWindow([sys.executable, "main.py"], args.runs)
+    print(f"main.py to window: {median:.3f}s (median of {args.runs})")
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "import_main_window": total,
+        "eager_lazy_modules": eager,
+        "time_to_window": median,
+        "time_to_window_runs": runs,
+        "top_imports": {
+            name: cumulative / 1e6
+            for name, (_, cumulative) in sorted(
+                modules.items(), key=lambda m: m[1][1], reverse=True
+            )[: args.top]
+        },
+    }
+
+    if args.exe:
+        median, runs = timeToWindow([os.path.abspath(args.exe)], args.runs)
+        print(f"{args.exe} to window: {median:.3f}s (median of {args.runs})")
+        report["exe_time_to_window"] = median
+        report["exe_time_to_window_runs"] = runs
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
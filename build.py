@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import tracing
+from utils import cacheDir
+
+MAX_WORKERS = os.cpu_count() or 4
+COMPILE_TIMEOUT = 120
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+# part of the cache key, bumped when what goes into an entry changes
+CACHE_VERSION = 2
+
+_evictLock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def compilerVersion(compiler):
+    """First line of `<compiler> --version`, part of the cache key"""
+    try:
+        proc = subprocess.run(
+            [compiler, "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            timeout=10,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    lines = proc.stdout.decode("utf-8", "replace").strip().splitlines()
+    return lines[0] if lines else ""
+
+
+# C/C++ headers next to the source, #include "x.h"
+LOCAL_INCLUDE = re.compile(rb'^\s*#\s*include\s*"([^"]+)"', re.M)
+
+
+def cacheKey(source, compile_cmd, version, fileBaseName="", includes=()):
+    """
+    Artifacts are named after the source, so its base name is part of the key,
+    as are the bytes of the local headers it includes. Anything else the
+    build reads (libraries, other sources on the command line) is not.
+    """
+    h = hashlib.sha256()
+    parts = (str(CACHE_VERSION).encode("utf-8"), compile_cmd.encode("utf-8"))
+    parts += (version.encode("utf-8"), fileBaseName.encode("utf-8"), source)
+    for part in parts + tuple(includes):
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def _localIncludes(pathStr, source):
+    """Bytes of the quoted headers `source` includes, and theirs, in order"""
+    contents = []
+    seen = set()
+    pending = [source]
+    while pending:
+        for name in LOCAL_INCLUDE.findall(pending.pop(0)):
+            path = os.path.normpath(
+                os.path.join(pathStr, name.decode("utf-8", "replace"))
+            )
+            if path in seen:
+                continue
+            seen.add(path)
+            try:
+                with open(path, "rb") as f:
+                    header = f.read()
+            except OSError:
+                # a missing header fails the compile, it's never cached
+                continue
+            contents += [name, header]
+            pending.append(header)
+    return contents
+
+
+def _folderFiles(pathStr, fileName):
+    """{name: (size, mtime)} of the files next to the source"""
+    files = {}
+    for entry in os.scandir(pathStr):
+        if entry.name != fileName and entry.is_file():
+            stat = entry.stat()
+            files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def _compiledFrom(path, fileName):
+    """Whether a .class file names `fileName` as its SourceFile"""
+    name = fileName.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return False
+    # both are CONSTANT_Utf8 entries of the constant pool
+    return (
+        b"\x01\x00\x0aSourceFile" in data
+        and b"\x01" + len(name).to_bytes(2, "big") + name in data
+    )
+
+
+def _isArtifact(pathStr, name, fileName):
+    """
+    Whether `name`, written while `fileName` compiled, is one of its outputs.
+    Other files of the folder compile at the same time, so only files named
+    after the source (1.exe, 1.jar, 1$Node.class) and class files compiled
+    from it (the other top level classes of 1.java) count.
+    """
+    fileBaseName = "".join(fileName.split(".")[0])
+    if name == fileBaseName or name.startswith(
+        (fileBaseName + ".", fileBaseName + "$")
+    ):
+        return True
+    return name.endswith(".class") and _compiledFrom(
+        os.path.join(pathStr, name), fileName
+    )
+
+
+def _restore(entryDir, meta, pathStr):
+    for name in meta["artifacts"]:
+        shutil.copy2(os.path.join(entryDir, name), os.path.join(pathStr, name))
+    # bump the entry so eviction treats it as recently used
+    os.utime(os.path.join(entryDir, "meta.json"))
+
+
+def _store(entryDir, pathStr, artifacts, output):
+    tmpDir = f"{entryDir}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.makedirs(tmpDir, exist_ok=True)
+    size = 0
+    for name in artifacts:
+        shutil.copy2(os.path.join(pathStr, name), os.path.join(tmpDir, name))
+        size += os.path.getsize(os.path.join(tmpDir, name))
+
+    meta = {"artifacts": sorted(artifacts), "output": output, "size": size}
+    with open(os.path.join(tmpDir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    try:
+        os.replace(tmpDir, entryDir)
+    except OSError:
+        # another run stored the same entry first
+        shutil.rmtree(tmpDir, ignore_errors=True)
+
+
+def evictBuildCache(limit=MAX_CACHE_BYTES):
+    """Drop least recently used entries until the cache fits in `limit` bytes"""
+    root = cacheDir("build")
+    with _evictLock:
+        entries = []
+        for entry in os.scandir(root):
+            metaPath = os.path.join(entry.path, "meta.json")
+            try:
+                with open(metaPath, "r", encoding="utf-8") as f:
+                    size = json.load(f)["size"]
+                entries.append((os.path.getmtime(metaPath), size, entry.path))
+            except (OSError, ValueError, KeyError):
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= limit:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+def compileFile(pathStr, fileName, compile_cmd, useCache=True):
+    """
+    Compile one source file with the language's `compile` template.
+
+    Results are cached per user, keyed on the source, its name, the local
+    headers it includes, the compile template and the compiler version, so an
+    unchanged file is restored instead of rebuilt.
+
+    Returns a dict with the file name, exit code, compiler diagnostics, how
+    long it took and whether it came from the cache.
+    """
+    fileBaseName = "".join(fileName.split(".")[0])
+    compileArgs = shlex.split(compile_cmd.replace("$s", pathStr + fileBaseName))
+
+    start = time.perf_counter()
+    entryDir = None
+    if useCache:
+        with open(os.path.join(pathStr, fileName), "rb") as f:
+            source = f.read()
+        key = cacheKey(
+            source,
+            compile_cmd,
+            compilerVersion(compileArgs[0]),
+            fileBaseName,
+            _localIncludes(pathStr, source),
+        )
+        entryDir = os.path.join(cacheDir("build"), key)
+        try:
+            with open(os.path.join(entryDir, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            _restore(entryDir, meta, pathStr)
+            return {
+                "file": fileName,
+                "returncode": 0,
+                "output": meta["output"],
+                "duration": time.perf_counter() - start,
+                "cached": True,
+            }
+        except (OSError, ValueError, KeyError):
+            pass
+
+    before = _folderFiles(pathStr, fileName)
+    try:
+        proc = subprocess.run(
+            compileArgs,
+            cwd=pathStr,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            timeout=COMPILE_TIMEOUT,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+        )
+        returncode = proc.returncode
+        output = proc.stdout.decode("utf-8", "replace")
+    except subprocess.TimeoutExpired:
+        returncode = -1
+        output = f"Compiling {fileName} took longer than {COMPILE_TIMEOUT}s"
+    except OSError as e:
+        returncode = -1
+        output = f"{compileArgs[0]}: {e}"
+
+    if entryDir and returncode == 0:
+        after = _folderFiles(pathStr, fileName)
+        artifacts = [
+            name
+            for name, stat in after.items()
+            if before.get(name) != stat and _isArtifact(pathStr, name, fileName)
+        ]
+        if artifacts:
+            _store(entryDir, pathStr, artifacts, output)
+            evictBuildCache()
+
+    return {
+        "file": fileName,
+        "returncode": returncode,
+        "output": output,
+        "duration": time.perf_counter() - start,
+        "cached": False,
+    }
+
+
+def _tracedCompile(pathStr, fileName, compile_cmd, tracer):
+    with tracer.span("compile", file=fileName) as attrs:
+        attrs["bytes_in"] = os.path.getsize(os.path.join(pathStr, fileName))
+        result = compileFile(pathStr, fileName, compile_cmd)
+        attrs["returncode"] = result["returncode"]
+        attrs["cached"] = result["cached"]
+        attrs["bytes_out"] = len(result["output"])
+    return result
+
+
+def startCompiles(pathStr, fileNames, compile_cmd, executor, tracer=tracing.NULL):
+    """
+    Submit every compile at once. Returns {fileName: Future}, so callers can
+    wait on files in their own order and start running each binary as soon
+    as it is ready while the rest are still compiling.
+    """
+    return {
+        fileName: executor.submit(
+            _tracedCompile, pathStr, fileName, compile_cmd, tracer
+        )
+        for fileName in fileNames
+    }
+
+
+def compilePool(workers=MAX_WORKERS):
+    # compilers are separate processes already, the pool only has to wait on them
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="compile")
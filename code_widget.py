@@ -1,4 +1,4 @@
-from PyQt5.QtCore import Qt, QEvent, QTimer, QMetaObject, Q_ARG, pyqtSlot, QObject
+from PyQt5.QtCore import Qt, QEvent, QTimer, QObject
 from PyQt5.QtGui import QColor, QFont, QPainter, QIntValidator
 from PyQt5.QtWidgets import (
     QFrame,
@@ -9,6 +9,9 @@ from PyQt5.QtWidgets import (
     QSizePolicy,
 )
 
+import os
+import re
+
 import pyperclip
 import asyncio
 from qfluentwidgets import (
@@ -25,16 +28,21 @@ from qfluentwidgets import (
 from qfluentwidgets import FluentIcon as FIF
 
 from config_setup import cfg
+from folder_index import FolderIndex
 from getName import get_clipboard_code_name
-from utils import save_file, commit_file, shortenPath
+from utils import CommitBatcher, save_file_async, shortenPath
 
 
 class CodeWidget(QFrame):
-    def __init__(self, parent=None, client=None):
+    def __init__(self, parent=None):
         super().__init__(parent)
         self.setObjectName("CodeWidget")
         self.selectedFolder = None
-        self.client = client
+
+        # highest number per extension, scanned in the background
+        self.folderIndex = FolderIndex(self)
+        self.folderIndex.changed.connect(self.updateCounterFromFolder)
+        self.commits = CommitBatcher()
 
         # --- animation settings ---
         self.ANIMATION_SPEED = 30
@@ -158,6 +166,11 @@ class CodeWidget(QFrame):
         self.bubbleTimer.timeout.connect(self.animateBubble)
         self.showText = False
         self.animating = False
+        # AI names still on their way, the ring stays up until they're all in
+        self.pendingNames = 0
+        self.resetTimer = QTimer(self)
+        self.resetTimer.setSingleShot(True)
+        self.resetTimer.timeout.connect(self.resetAnimation)
 
     def updateFileLabel(self):
         num = self.counterBox.text().strip() or "1"
@@ -185,7 +198,8 @@ class CodeWidget(QFrame):
             short = shortenPath(folder)
             self.folderLabel.setText(short)
 
-            self.updateCounterFromFolder()
+            # the counter updates once the first scan is done
+            self.folderIndex.setFolder(folder)
 
     def installRecursiveEventFilter(self, parent):
         parent.installEventFilter(self)
@@ -195,9 +209,6 @@ class CodeWidget(QFrame):
     def eventFilter(self, obj, event):
         if event.type() == QEvent.KeyPress:
             if event.modifiers() == Qt.ControlModifier and event.key() == Qt.Key_V:
-                if self.animating:
-                    return True
-
                 if not self.selectedFolder:
                     InfoBar.warning(
                         title="No Folder Selected",
@@ -208,24 +219,29 @@ class CodeWidget(QFrame):
                     )
                     return True
 
-                if not self.client:
+                useAi = self.useAiCheck.isChecked()
+                # snapshot now, the clipboard may hold the next snippet by the
+                # time this one's name comes back
+                code = pyperclip.paste()
+                if not code.strip():
                     return True
 
-                self.animating = True
-                self.loadingRing.setVisible(True)
-                self.centerLabel.setVisible(False)
-
-                asyncio.create_task(self.fetchNameAndSave())
+                self.queuePaste(code, useAi)
                 return True
         return super().eventFilter(obj, event)
 
-    def incrementCount(self):
-        try:
-            val = int(self.counterBox.text() or "0")
-        except ValueError:
-            val = 0
-        val += 1
-        self.counterBox.setText(str(val))
+    def queuePaste(self, code, useAi):
+        """Take the next number now, saving and naming happen in the background"""
+        count = int(self.counterBox.text() or 0)
+        ext = self.extPicker.currentText().strip()
+
+        self.folderIndex.noteSaved(f"{count}{ext}")
+        self.counterBox.setText(str(count + 1))
+
+        autoCommit = self.autoCommit.isChecked()
+        asyncio.create_task(
+            self.saveAndName(self.selectedFolder, count, ext, code, useAi, autoCommit)
+        )
 
     def triggerSaveAnimation(self, filename: str = None):
         """
@@ -239,8 +255,8 @@ class CodeWidget(QFrame):
         self.showText = True
         self.bubbleTimer.start(16)
 
-        # schedule reset of animation after duration
-        QTimer.singleShot(self.FILE_SAVED_DURATION, self.resetAnimation)
+        # schedule reset of animation after duration, a new paste restarts it
+        self.resetTimer.start(self.FILE_SAVED_DURATION)
 
         # if we have a filename, schedule the InfoBar just after reset
         if filename:
@@ -286,48 +302,49 @@ class CodeWidget(QFrame):
             painter.setFont(font)
             painter.drawText(self.centerFrame.geometry(), Qt.AlignCenter, "File Saved")
 
-    async def fetchNameAndSave(self):
+    async def saveAndName(self, folder, count, ext, code, useAi, autoCommit):
+        filename = f"{count}{ext}"
         try:
-            use_ai = self.useAiCheck.isChecked()
-            auto_commit = self.autoCommit.isChecked()
-            count = int(self.counterBox.text() or 0)
-
-            ext = self.extPicker.currentText().strip()
-            if use_ai:
-                name = await get_clipboard_code_name(self.client)
-                filename = f"{count}_{name}{ext}" if name else f"{count}{ext}"
-            else:
-                filename = f"{count}{ext}"
-
-            pathToSave = self.selectedFolder + "/" + filename
+            await save_file_async(full_path=folder + "/" + filename, content=code)
 
-            # just end here silently, no InfoBars
-            QMetaObject.invokeMethod(
-                self, "finishFetch", Qt.QueuedConnection, Q_ARG(str, filename)
-            )
+            if not useAi:
+                self.triggerSaveAnimation(filename)
+            else:
+                self.triggerSaveAnimation()
+                filename = await self.nameSavedFile(folder, count, ext, code)
+                self.showFileSavedInfo(filename)
 
-            code = pyperclip.paste()
-            save_file(full_path=pathToSave, content=code)
+            if autoCommit:
+                self.commits.add(folder, filename)
 
-            if auto_commit:
-                commit_text = f"Added a new file {filename}"
-                commit_file(folder_path=self.selectedFolder, commit_text=commit_text)
+        except Exception as e:
+            print("Error saving file:", e)
 
+    async def nameSavedFile(self, folder, count, ext, code):
+        """Rename `count.ext` to `count_name.ext` once the AI answers, returns the name"""
+        filename = f"{count}{ext}"
+        self.pendingNames += 1
+        self.loadingRing.setVisible(True)
+        try:
+            name = await get_clipboard_code_name(code)
         except Exception as e:
             print("Error fetching name:", e)
-
-    @pyqtSlot(str)
-    def finishFetch(self, filename):
-        self.loadingRing.setVisible(False)
-
-        # nothing returned, quiet cancel
-        if not filename:
-            self.animating = False
-            self.centerLabel.setVisible(True)
-            return
-
-        # start animation and ensure InfoBar shows AFTER animation
-        self.triggerSaveAnimation(filename)
+            name = None
+        finally:
+            self.pendingNames -= 1
+            self.loadingRing.setVisible(self.pendingNames > 0)
+
+        name = re.sub(r"[^\w\-]+", "_", name or "").strip("_")
+        named = f"{count}_{name}{ext}"
+        if not name or os.path.exists(os.path.join(folder, named)):
+            return filename
+        try:
+            os.rename(os.path.join(folder, filename), os.path.join(folder, named))
+        except OSError as e:
+            print("Error renaming file:", e)
+            return filename
+        self.folderIndex.noteSaved(named)
+        return named
 
     def showFileSavedInfo(self, filename):
         # InfoBar called only after animation completely finished
@@ -339,9 +356,6 @@ class CodeWidget(QFrame):
             parent=self,
         )
 
-        # increment after InfoBar shows (small delay so it feels natural)
-        self.incrementCount()
-
     def updateCounterFromFolder(self):
         if not self.selectedFolder:
             return
@@ -350,21 +364,10 @@ class CodeWidget(QFrame):
         if not ext.startswith("."):
             ext = f".{ext}"
 
-        import os, re
-
-        max_num = 0
-        num_pattern = re.compile(r"^(\d+)_?.*")
-
-        for fname in os.listdir(self.selectedFolder):
-            # check both start with number and ends with selected extension
-            if fname.endswith(ext):
-                match = num_pattern.match(fname)
-                if match:
-                    try:
-                        num = int(match.group(1))
-                        max_num = max(max_num, num)
-                    except ValueError:
-                        pass
+        nextNum = self.folderIndex.nextNumber(ext)
+        if nextNum is None:
+            return
 
         # set next count
-        self.counterBox.setText(str(max_num + 1))
+        if self.counterBox.text() != str(nextNum):
+            self.counterBox.setText(str(nextNum))
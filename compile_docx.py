@@ -1,19 +1,22 @@
+import hashlib
 import json
-import shutil
+import logging
 import sys
-from PIL import Image
 import os
-import shlex
-import subprocess
-from docx.shared import Inches
-from docx import Document
-import window_task
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+import build
+import input_extract
+import runner
+import report_manifest
+import session_cache
+import tracing
 from dotenv import load_dotenv
-from openai import OpenAI
-from config_setup import cfg, language_names
 
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
 EXTENTION = ".c"
 COMPILE_STR = "gcc $s.c -o $s"
 RUN_STR = "$s.exe"
@@ -47,98 +50,192 @@ def generateDocx(
     page_break=False,
     heading=HEADING,
     paragraph=PARAGRAPH,
+    input_calls=None,
+    incremental=True,
+    cancel=None,
+    client=None,
+    tracer=None,
+    pools=None,
+    writer="python-docx",
+    highlight=True,
 ):
-    path = os.fsencode(pathStr)
-    listDir = os.listdir(path)
-    listDir.sort(key=sort_key)
-
-    filenameCodeDict = genFilenameCodeDict(pathStr, extension, listDir)
-    if res is None:
-        prompt = genPropt(extension, filenameCodeDict)
-        print("\n\n\n")
-
-        client = OpenAI(api_key=cfg.openai_key.value)
-        res = client.responses.create(model="gpt-4o-mini", input=prompt)
-        response = json.loads(res.output[0].content[0].text)
+    # python-docx, Pillow (via scheduler) and openai take a while to import,
+    # the app only pays for them once a report is generated
+    import docx_writer
+    import scheduler
+
+    tracer = tracer or tracing.NULL
+
+    with tracer.span("list") as attrs:
+        path = os.fsencode(pathStr)
+        listDir = os.listdir(path)
+        listDir.sort(key=sort_key)
+
+        filenameCodeDict = genFilenameCodeDict(pathStr, extension, listDir)
+        attrs["files"] = list(filenameCodeDict)
+    version = promptVersion()
+    response, missing = session_cache.lookup(extension, filenameCodeDict, version)
+    log.info(
+        "Input sessions cached for %d/%d files", len(response), len(filenameCodeDict)
+    )
+
+    if res is not None:
+        generated = json.loads(res)
     else:
-        response = json.loads(res)
-
-    print("\n\nRUNNING\n\n")
+        # files that never read stdin don't need the model at all
+        with tracer.span("prompt"):
+            noInput, skeletons = input_extract.splitByInput(missing, input_calls)
+        generated = {fileName: [] for fileName in noInput}
+
+        def buildPrompt(extension, chunk):
+            with tracer.span("prompt", files=len(chunk)):
+                return genPropt(extension, chunk)
+
+        if skeletons:
+            import ai_sessions
+
+            with tracer.span("llm", files=len(skeletons), cached=len(response)):
+                generated.update(
+                    ai_sessions.generateSessionsSync(
+                        extension,
+                        skeletons,
+                        buildPrompt,
+                        client=client,
+                    )
+                )
 
-    imageDict = {}
-    for fileName in filenameCodeDict:
-        fileBaseName = "".join(fileName.split(".")[0])
+    session_cache.store(extension, filenameCodeDict, generated, version)
+    response.update(generated)
 
-        if compile_cmd != "":
-            compileArgs = shlex.split(compile_cmd.replace("$s", pathStr + fileBaseName))
-            subprocess.run(
-                compileArgs,
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+    savePath = pathStr + "docx_generated.docx"
+    document = docx_writer.openWriter(writer, savePath)
+
+    document.addHeading(heading.replace("$s", pathStr.split("/")[-2]), 1)
+    document.addParagraph(paragraph)
+
+    # sections of files that didn't change since the last report are reused
+    settings = {"compile": compile_cmd, "run": run_cmd}
+    manifest = report_manifest.load(pathStr, settings) if incremental else None
+    reused = {}
+    if manifest:
+        manifest["files"] = {
+            f: e for f, e in manifest["files"].items() if f in filenameCodeDict
+        }
+        for fileName, code in filenameCodeDict.items():
+            images = report_manifest.reusableImages(
+                pathStr, manifest, fileName, code, response.get(fileName, [])
             )
+            if images is not None:
+                reused[fileName] = images
+        log.info("Reusing %d/%d sections", len(reused), len(filenameCodeDict))
 
-        inputs = response[fileName]
-
-        imageDict[fileName] = []
-        imageFileName = f"{fileName}(0)"
-
-        runArgsStr = run_cmd.replace("$s", pathStr + fileBaseName)
-        runArgsStr = f"cd {pathStr} && {runArgsStr}"
-
-        if len(inputs) == 0:
-            res = window_task.runTypeAndSS(runArgsStr, "", imageFileName)
-            if res == -1:
-                window_task.closeAllCMD()
-                raise TimeoutError()
-
-            imageDict[fileName].append(imageFileName)
-
-        for i, inp in enumerate(inputs):
-            imageFileName = f"{fileName}({i})"
-            res = window_task.runTypeAndSS(runArgsStr, inp, imageFileName)
-            if res == -1:
-                window_task.closeAllCMD()
-                raise ValueError(
-                    "Pressed x... closing all cmds and cancelling operation"
-                )
+    changed = [fileName for fileName in filenameCodeDict if fileName not in reused]
 
-            imageDict[fileName].append(imageFileName)
+    compiled = {}
+    # batch runs pass one (compile, run) pool pair shared by all folders
+    if pools:
+        poolContext = nullcontext(pools)
+    else:
+        poolContext = _ownPools(build.compilePool(), scheduler.runPool())
+    with poolContext as (compilePool, runPool):
+        if compile_cmd != "":
+            compiled = build.startCompiles(
+                pathStr, changed, compile_cmd, compilePool, tracer=tracer
+            )
 
-    window_task.closeAllCMD()
-    document = Document()
+        # every (file, session) pair runs at once, each waiting only on its own
+        # compile; sections are still written in sort order as results come in
+        runs = scheduler.startRuns(
+            pathStr,
+            {fileName: response.get(fileName, []) for fileName in changed},
+            run_cmd,
+            compiled,
+            runPool,
+            cancel=cancel,
+            tracer=tracer,
+        )
+
+        try:
+            for fileName, code in filenameCodeDict.items():
+                images = reused.pop(fileName, None)
+                wasReused = images is not None
+                if images is None:
+                    images, ok = scheduler.collect(runs.pop(fileName))
+                    # failures are redone next time, e.g. once the compiler is on PATH
+                    if manifest and not ok:
+                        manifest["files"].pop(fileName, None)
+                    elif manifest:
+                        report_manifest.record(
+                            pathStr,
+                            manifest,
+                            fileName,
+                            code,
+                            response.get(fileName, []),
+                            images,
+                        )
+                with tracer.span(
+                    "docx", file=fileName, reused=wasReused, images=len(images)
+                ):
+                    addSection(
+                        document,
+                        fileName,
+                        code,
+                        images,
+                        page_break,
+                        extension if highlight else None,
+                    )
+        except BaseException as e:
+            document.abort()
+            if isinstance(e, runner.Cancelled):
+                for future in list(compiled.values()) + sum(runs.values(), []):
+                    future.cancel()
+            raise
+
+    with tracer.span("save") as attrs:
+        document.close()
+        attrs["bytes_out"] = os.path.getsize(savePath)
+    if manifest:
+        report_manifest.save(pathStr, manifest)
 
-    document.add_heading(heading.replace("$s", pathStr.split("/")[-2]), level=1)
-    document.add_paragraph(paragraph)
+    return savePath
 
-    os.makedirs("screenshots", exist_ok=True)
 
-    print(imageDict)
+@contextmanager
+def _ownPools(compilePool, runPool):
+    with compilePool, runPool:
+        yield compilePool, runPool
 
-    for fileName, code in filenameCodeDict.items():
-        document.add_heading(fileName, level=2)
-        document.add_paragraph(code)
 
-        for imageName in imageDict[fileName]:
-            imagePath = f"screenshots/{imageName}.png"
-            with Image.open(imagePath) as img:
-                width, height = img.size
-                ratio = height / width
-                target_width = Inches(5)
-                target_height = Inches(5 * ratio)
+def saveTrace(pathStr, tracer, chrome=False):
+    """Write the run's spans next to the manifest, returns the JSON-lines path"""
+    folder = report_manifest.dataDir(pathStr)
+    tracePath = os.path.join(folder, "trace.jsonl")
+    tracer.writeJsonl(tracePath)
+    if chrome:
+        tracer.writeChromeTrace(os.path.join(folder, "trace.json"))
+    return tracePath
 
-            document.add_picture(imagePath, width=target_width, height=target_height)
 
-        if page_break:
-            document.add_page_break()
-        else:
-            document.add_paragraph("\n")
+def addSection(document, fileName, code, images, page_break, extension=None):
+    """`extension` picks the highlighting, None leaves the code plain"""
+    import highlight
+    from render import IMAGE_INCHES
 
-    savePath = pathStr + "docx_generated.docx"
-    document.save(savePath)
+    document.addHeading(fileName, 2)
+    if extension:
+        document.addCode(highlight.highlight(code, extension))
+    else:
+        document.addCode(((None, code),))
 
-    if os.path.exists("screenshots"):
-        shutil.rmtree("screenshots")
+    # sizes come from the renderer, no need to decode the PNGs again; both
+    # writers store identical images once, however often they are added
+    for imageBuf, (width, height) in images:
+        document.addPicture(imageBuf, IMAGE_INCHES, IMAGE_INCHES * height / width)
 
-    return savePath
+    if page_break:
+        document.addPageBreak()
+    else:
+        document.addParagraph("\n")
 
 
 def genFilenameCodeDict(pathStr, extension, listDir):
@@ -152,7 +249,15 @@ def genFilenameCodeDict(pathStr, extension, listDir):
     return filenameCodeDict
 
 
+@lru_cache(maxsize=None)
+def promptVersion():
+    """Hash of prompt_def.md, cached input sessions are only valid for the same prompt"""
+    with open(resource_path("prompt_def.md"), "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()[:16]
+
+
 def genPropt(extension, filenameCodeDict):
+    # prompt_def.md first and unchanged, so the provider can cache the prefix
     with open(resource_path("prompt_def.md"), "r", encoding="utf-8") as file:
         prompt = file.read()
 
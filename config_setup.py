@@ -1,6 +1,8 @@
 import sys
 import os
 import json
+import atexit
+import threading
 from qfluentwidgets import (
     QConfig,
     ConfigItem,
@@ -10,6 +12,8 @@ from qfluentwidgets import (
     qconfig,
 )
 
+from docx_writer import WRITERS
+
 
 def resource_path(relative_path):
     if hasattr(sys, "_MEIPASS"):
@@ -18,6 +22,9 @@ def resource_path(relative_path):
 
 
 LANG_FILE = resource_path("languages.json")
+CONFIG_FILE = "config.json"
+# settings cards save on every toggle/keystroke, coalesce them into one write
+SAVE_DELAY = 0.5
 
 
 def load_languages():
@@ -29,6 +36,24 @@ def load_languages():
 
 languages_data = load_languages()
 language_names = [lang["name"] for lang in languages_data] or ["C", "Python"]
+_defaultLanguages = {lang["name"]: lang for lang in languages_data}
+
+
+# saved by older versions, matched Iterator.next() too; languages.json's
+# current patterns take their place
+RETIRED_CALLS = {"\\.next\\w*\\s*\\("}
+
+
+def inputCalls(lang_conf):
+    """stdin call patterns of a language, older saved configs fall back to languages.json"""
+    defaults = _defaultLanguages.get(lang_conf.get("name"), {}).get("input_calls")
+    calls = lang_conf.get("input_calls")
+    if calls is None:
+        return defaults
+    if defaults and RETIRED_CALLS.intersection(calls):
+        calls = [c for c in calls if c not in RETIRED_CALLS]
+        calls += [c for c in defaults if c not in calls]
+    return calls
 
 
 class AppConfig(QConfig):
@@ -38,9 +63,57 @@ class AppConfig(QConfig):
     pageBreak = ConfigItem("DOCX", "PageBreak", True, BoolValidator())
     heading = ConfigItem("DOCX", "Heading", "My Document")
     paragraph = ConfigItem("DOCX", "Paragraph", "Generated by save-code-x")
+    chromeTrace = ConfigItem("DOCX", "ChromeTrace", False, BoolValidator())
+    highlightCode = ConfigItem("DOCX", "HighlightCode", True, BoolValidator())
+    # "stream" writes document.xml directly, faster on large reports
+    docxWriter = OptionsConfigItem(
+        "DOCX", "Writer", "python-docx", OptionsValidator(WRITERS)
+    )
     languages = ConfigItem("Lang", "Configs", languages_data)
     openai_key = ConfigItem("API", "OpenAIKey", "", validator=None)
+    openai_base_url = ConfigItem("API", "BaseURL", "", validator=None)
+    aiNames = ConfigItem("API", "AINameFallback", True, BoolValidator())
+
+    def __init__(self):
+        super().__init__()
+        self._saveLock = threading.Lock()
+        self._saveTimer = None
+        self._languagesByName = {}
+        self.languages.valueChanged.connect(self._indexLanguages)
+
+    def _indexLanguages(self, *_):
+        self._languagesByName = {lang["name"]: lang for lang in self.languages.value}
+
+    def languageConfig(self, name=None):
+        """Config dict of a language by name (the selected one by default), or None"""
+        return self._languagesByName.get(name or self.language.value)
+
+    def save(self):
+        """Write the config shortly after the last change instead of on every one"""
+        with self._saveLock:
+            if self._saveTimer:
+                self._saveTimer.cancel()
+            self._saveTimer = threading.Timer(SAVE_DELAY, self.flush)
+            self._saveTimer.daemon = True
+            self._saveTimer.start()
+
+    def flush(self):
+        """Write pending changes now, through a temp file so a crash can't truncate it"""
+        with self._saveLock:
+            if self._saveTimer:
+                self._saveTimer.cancel()
+                self._saveTimer = None
+            path = str(self.file)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self.toDict(), f, ensure_ascii=False, indent=4)
+            os.replace(path + ".tmp", path)
 
 
 cfg = AppConfig()
-qconfig.load("config.json", cfg, autoSave=True)
+# the only load; every module imports `cfg` from here
+qconfig.load(CONFIG_FILE, cfg)
+cfg._indexLanguages()
+# setting cards go through qconfig.set(), which saves via the shared qconfig
+qconfig.save = cfg.save
+atexit.register(lambda: cfg._saveTimer and cfg.flush())
@@ -1,64 +1,76 @@
+import json
 import os
 import subprocess
-import asyncio
+import threading
+import time
 
-from PyQt5.QtCore import Qt, QThread, QTimer, QSize, pyqtSignal
-from PyQt5.QtGui import QFont, QGuiApplication, QKeySequence
+from PyQt5.QtCore import Qt, QThread, QSize, pyqtSignal
+from PyQt5.QtGui import QGuiApplication, QKeySequence
 from PyQt5.QtWidgets import (
     QFrame,
     QShortcut,
     QVBoxLayout,
     QHBoxLayout,
-    QLabel,
     QFileDialog,
     QMessageBox,
+    QHeaderView,
+    QTableWidgetItem,
 )
 
 from qfluentwidgets import (
     SubtitleLabel,
     Dialog,
-    TextEdit,
     ComboBox,
     BodyLabel,
     SettingCardGroup,
-    Flyout,
     PushSettingCard,
     ComboBoxSettingCard,
+    SwitchSettingCard,
     PrimaryPushButton,
+    PushButton,
     InfoBar,
     InfoBarPosition,
-    IndeterminateProgressRing,
-    FlyoutView,
-    qconfig,
+    ProgressBar,
+    TableWidget,
     setFont,
 )
 from qfluentwidgets import FluentIcon as FIF
 
-from compile_docx import genFilenameCodeDict, genPropt, sort_key
-from config_setup import cfg, language_names
-
-qconfig.load("config.json", cfg)
-print(cfg)
+import input_extract
+import runner
+import session_cache
+import tracing
+from source_watcher import SourceWatcher
+from compile_docx import genFilenameCodeDict, genPropt, promptVersion, sort_key
+from config_setup import cfg, inputCalls, language_names
 
 
 class DocxWorker(QThread):
     finished = pyqtSignal(str)
     failed = pyqtSignal(str)
+    # ("start" | "end", span record), emitted from the pipeline's worker threads
+    progress = pyqtSignal(str, object)
 
     def __init__(self, folder, res):
         super().__init__()
         self.folder = folder
         self.res = res
+        self.cancelEvent = threading.Event()
+        self.tracer = tracing.Tracer(listener=self.onSpan)
+
+    def onSpan(self, event, record):
+        # attrs keep changing until the span ends, send a copy
+        self.progress.emit(event, dict(record, attrs=dict(record["attrs"])))
+
+    def cancel(self):
+        # the running program is killed and generateDocx raises Cancelled
+        self.cancelEvent.set()
 
     def run(self):
-        try:
-            print(self.res)
-            import compile_docx
+        import compile_docx
 
-            lang_conf = next(
-                (l for l in cfg.languages.value if l["name"] == cfg.language.value),
-                None,
-            )
+        try:
+            lang_conf = cfg.languageConfig()
             if not lang_conf:
                 raise ValueError("Invalid language config")
 
@@ -71,19 +83,44 @@ class DocxWorker(QThread):
                 page_break=cfg.pageBreak.value,
                 heading=cfg.heading.value,
                 paragraph=cfg.paragraph.value,
+                input_calls=inputCalls(lang_conf),
+                cancel=self.cancelEvent,
+                tracer=self.tracer,
+                writer=cfg.docxWriter.value,
+                highlight=cfg.highlightCode.value,
             )
 
+            self.saveTrace(compile_docx)
             self.finished.emit(docx_path)
+        except runner.Cancelled:
+            self.saveTrace(compile_docx)
+            self.failed.emit("Cancelled")
         except Exception as e:
+            self.saveTrace(compile_docx)
             self.failed.emit(str(e))
 
+    def saveTrace(self, compile_docx):
+        try:
+            compile_docx.saveTrace(
+                self.folder + "/", self.tracer, chrome=cfg.chromeTrace.value
+            )
+        except OSError as e:
+            print(f"Could not write trace: {e}")
+
 
 class DocxWidget(QFrame):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.selectedFolder = None
+        self.worker = None
+        self.watchBuild = False
+        # a watch build was asked for while another build was running
+        self.watchPending = False
         self.setObjectName("MakeDocxWidget")
 
+        self.sourceWatcher = SourceWatcher(self)
+        self.sourceWatcher.changed.connect(self.onSourcesChanged)
+
         # --- main layout ---
         layout = QVBoxLayout(self)
         layout.setAlignment(Qt.AlignTop)
@@ -132,23 +169,90 @@ class DocxWidget(QFrame):
             parent=self.docxGroup,
         )
 
+        self.watchCard = SwitchSettingCard(
+            icon=FIF.SYNC,
+            title="Watch Folder",
+            content="Regenerate the report in the background as files are saved",
+            parent=self.docxGroup,
+        )
+        self.watchCard.checkedChanged.connect(self.updateWatch)
+        cfg.language.valueChanged.connect(self.updateWatch)
+
         # Add cards to the group
         self.docxGroup.addSettingCard(self.folderCard)
         self.docxGroup.addSettingCard(self.langCard)
+        self.docxGroup.addSettingCard(self.watchCard)
 
         self.generateBtn = PrimaryPushButton(FIF.DOCUMENT, "Generate")
         self.generateBtn.setFixedSize(QSize(220, 46))
         self.generateBtn.clicked.connect(self.generateDocx)
 
+        self.cancelBtn = PushButton(FIF.CLOSE, "Cancel")
+        self.cancelBtn.setFixedSize(QSize(220, 46))
+        self.cancelBtn.clicked.connect(self.cancelDocx)
+        self.cancelBtn.hide()
+
+        # --- live progress, one row per file ---
+        self.progressLabel = BodyLabel("")
+        self.progressBar = ProgressBar(self)
+        self.progressTable = TableWidget(self)
+        self.progressTable.setColumnCount(3)
+        self.progressTable.setHorizontalHeaderLabels(["File", "Stage", "Time"])
+        self.progressTable.verticalHeader().hide()
+        self.progressTable.setEditTriggers(TableWidget.NoEditTriggers)
+        header = self.progressTable.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        for w in (self.progressLabel, self.progressBar, self.progressTable):
+            w.hide()
+
         layout.addWidget(self.docxGroup)
         layout.addWidget(self.generateBtn, 0, Qt.AlignCenter)
-        layout.addStretch()
+        layout.addWidget(self.cancelBtn, 0, Qt.AlignCenter)
+        layout.addWidget(self.progressLabel)
+        layout.addWidget(self.progressBar)
+        layout.addWidget(self.progressTable, 1)
 
     def selectFolder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Folder")
         if folder:
             self.selectedFolder = folder
             self.folderCard.setContent(folder)
+            self.updateWatch()
+
+    def updateWatch(self, *_):
+        lang_conf = cfg.languageConfig()
+        if self.watchCard.isChecked() and self.selectedFolder and lang_conf:
+            self.sourceWatcher.watch(self.selectedFolder, lang_conf["extension"])
+        else:
+            self.sourceWatcher.stop()
+            self.watchPending = False
+
+    def onSourcesChanged(self):
+        # one build at a time; changes during a build get one more afterwards,
+        # which only redoes the sections of the files that changed
+        if self.worker and self.worker.isRunning():
+            self.watchPending = True
+            return
+        self.genWatchDocx()
+
+    def genWatchDocx(self):
+        if self.semiAutoAi.currentText() != "Semi Auto":
+            self.genDocx(watch=True)
+            return
+        # Semi Auto never asks the model itself, only rebuild what needs no inputs
+        try:
+            res, skeletons = self.offlineResponse()
+        except OSError as e:
+            self.progressLabel.setText(f"Could not read {self.selectedFolder}: {e}")
+            return
+        if res is None:
+            names = ", ".join(skeletons)
+            self.progressLabel.setText(f"New inputs needed for {names}, click Generate")
+            self.progressLabel.show()
+            return
+        self.genDocx(res, watch=True)
 
     def generateDocx(self):
         if not self.selectedFolder:
@@ -159,11 +263,13 @@ class DocxWidget(QFrame):
         elif self.semiAutoAi.currentText() == "Semi Auto":
             self.genSemiAutoAI()
 
-    def genSemiAutoAI(self):
-        lang_conf = next(
-            (l for l in cfg.languages.value if l["name"] == cfg.language.value),
-            None,
-        )
+    def offlineResponse(self):
+        """
+        (response, skeletons) of the selected folder without the model: a
+        response when every file is cached or reads nothing, otherwise None
+        and the input skeletons the model has to answer for.
+        """
+        lang_conf = cfg.languageConfig()
         extension = lang_conf["extension"]
         pathStr = self.selectedFolder
         print(pathStr)
@@ -172,7 +278,20 @@ class DocxWidget(QFrame):
         listDir.sort(key=sort_key)
 
         filenameCodeDict = genFilenameCodeDict(pathStr, extension, listDir)
-        prompt = genPropt(extension, filenameCodeDict)
+        _, missing = session_cache.lookup(extension, filenameCodeDict, promptVersion())
+        noInput, skeletons = input_extract.splitByInput(missing, inputCalls(lang_conf))
+        if skeletons:
+            return None, skeletons
+        return json.dumps({fileName: [] for fileName in noInput}), skeletons
+
+    def genSemiAutoAI(self):
+        res, skeletons = self.offlineResponse()
+        if res is not None:
+            # every file is cached or reads nothing, nothing to ask the model
+            self.genDocx(res)
+            return
+
+        prompt = genPropt(cfg.languageConfig()["extension"], skeletons)
 
         QGuiApplication.clipboard().setText(prompt)
 
@@ -180,121 +299,154 @@ class DocxWidget(QFrame):
 
         pass
 
-    def genDocx(self, res=None):
-        self.progressRing = IndeterminateProgressRing(self)
-        self.progressRing.setFixedSize(80, 80)
-        self.progressRing.move(
-            (self.width() - self.progressRing.width()) // 2,
-            (self.height() - self.progressRing.height()) // 2,
-        )
-        self.progressRing.start()
-        self.progressRing.show()
-        self.setDisabled(True)
-
-        InfoBar.info(
-            title="Generating DOCX...",
-            content="Hold tight while we compile your file 👀",
-            position=InfoBarPosition.TOP,
-            duration=2000,
-            parent=self,
-        )
-        QTimer.singleShot(
-            1000,
-            lambda: InfoBar.warning(
-                title="Please don't touch your keyboard 🧠",
-                content="The outputs will be shown and taken screenshot of automatically...",
+    def genDocx(self, res=None, watch=False):
+        self.watchBuild = watch
+        self.watchPending = False
+        self.resetProgress()
+        self.setBusy(True)
+
+        if not watch:
+            InfoBar.info(
+                title="Generating DOCX...",
+                content="Hold tight while we compile and run your files 👀",
                 position=InfoBarPosition.TOP,
-                duration=5000,
+                duration=2000,
                 parent=self,
-            ),
-        )
+            )
 
         self.worker = DocxWorker(self.selectedFolder, res)
         self.worker.finished.connect(lambda path: self.onDocxDone(path))
         self.worker.failed.connect(lambda err: self.onDocxFail(err))
+        self.worker.progress.connect(self.onProgress)
         self.worker.start()
 
-    def onDocxDone(self, docx_path):
-        self.progressRing.stop()
-        self.progressRing.hide()
-        self.setDisabled(False)
-
-        folder_path = "\\".join(docx_path.split("/")[:-1])
-        print(folder_path)
-        subprocess.run(["explorer", folder_path])
-        InfoBar.success(
-            title="Done",
-            content=f"DOCX saved to:\n{docx_path}",
-            position=InfoBarPosition.TOP,
-            duration=4000,
-            parent=self,
-        )
-
-    def onDocxFail(self, err):
-        self.progressRing.stop()
-        self.progressRing.hide()
-        self.setDisabled(False)
-
-        InfoBar.error(
-            title="Generation Failed",
-            content=str(err),
-            position=InfoBarPosition.TOP,
-            duration=5000,
-            parent=self,
-        )
-
-        # Language selection card
-        self.langCard = ComboBoxSettingCard(
-            configItem=cfg.language,
-            icon=FIF.CODE,
-            title="Language",
-            content="Select the programming language of your source files",
-            texts=language_names,
-            parent=self.docxGroup,
-        )
-
-        # Add cards to the group
-        self.docxGroup.addSettingCard(self.folderCard)
-        self.docxGroup.addSettingCard(self.langCard)
-
-        self.generateBtn = PrimaryPushButton(FIF.DOCUMENT, "Generate")
-        self.generateBtn.setFixedSize(QSize(220, 46))
-        self.generateBtn.clicked.connect(self.generateDocx)
+    def resetProgress(self):
+        self.fileRows = {}
+        self.fileTimes = {}
+        self.fileProblems = {}
+        self.progressTable.setRowCount(0)
+        self.progressBar.setValue(0)
+        self.progressLabel.setText("Reading files...")
+        for w in (self.progressLabel, self.progressBar, self.progressTable):
+            w.show()
+
+    def setFileStage(self, fileName, stage, seconds=None):
+        row = self.fileRows.get(fileName)
+        if row is None:
+            return
+        self.progressTable.setItem(row, 1, QTableWidgetItem(stage))
+        if seconds is not None:
+            self.fileTimes[fileName] = self.fileTimes.get(fileName, 0.0) + seconds
+            self.progressTable.setItem(
+                row, 2, QTableWidgetItem(f"{self.fileTimes[fileName]:.2f}s")
+            )
 
-    def selectFolder(self):
-        folder = QFileDialog.getExistingDirectory(self, "Select Folder")
-        if folder:
-            self.selectedFolder = folder
-            self.folderCard.setContent(folder)
+    def onProgress(self, event, span):
+        name, attrs = span["name"], span["attrs"]
+        fileName = attrs.get("file")
+        ended = event == "end"
+
+        if name == "list" and ended:
+            files = attrs.get("files", [])
+            self.progressTable.setRowCount(len(files))
+            for row, f in enumerate(files):
+                self.fileRows[f] = row
+                self.progressTable.setItem(row, 0, QTableWidgetItem(f))
+                self.progressTable.setItem(row, 1, QTableWidgetItem("Queued"))
+            self.progressBar.setRange(0, max(len(files), 1))
+        elif name == "llm":
+            self.progressLabel.setText(
+                "Compiling and running..."
+                if ended
+                else f"Asking AI for inputs of {attrs.get('files')} files..."
+            )
+        elif name == "compile":
+            if not ended:
+                self.setFileStage(fileName, "Compiling")
+            elif attrs.get("returncode"):
+                self.fileProblems[fileName] = "compile failed"
+                self.setFileStage(fileName, "Compile failed", span["duration"])
+            else:
+                stage = "Compiled (cached)" if attrs.get("cached") else "Compiled"
+                self.setFileStage(fileName, stage, span["duration"])
+        elif name == "run":
+            session = attrs.get("session", 0) + 1
+            if not ended:
+                self.setFileStage(fileName, f"Running session {session}")
+            else:
+                status = attrs.get("status", "error")
+                if status != "ok":
+                    self.fileProblems[fileName] = status
+                stage = f"Session {session} {'done' if status == 'ok' else status}"
+                self.setFileStage(fileName, stage, span["duration"])
+        elif name == "render" and ended:
+            self.setFileStage(fileName, "Rendered", span["duration"])
+        elif name == "docx" and ended:
+            stage = "Reused" if attrs.get("reused") else "Done"
+            if fileName in self.fileProblems:
+                stage += f" ({self.fileProblems[fileName]})"
+            self.setFileStage(fileName, stage)
+            self.progressBar.setValue(self.progressBar.value() + 1)
+            self.progressLabel.setText(
+                f"{self.progressBar.value()}/{self.progressBar.maximum()} sections written"
+            )
+        elif name == "save" and not ended:
+            self.progressLabel.setText("Saving document...")
+
+    def setBusy(self, busy):
+        # stays enabled while generating so the run can be cancelled,
+        # and watching can be switched off
+        self.folderCard.setDisabled(busy)
+        self.langCard.setDisabled(busy)
+        self.semiAutoAi.setDisabled(busy)
+        self.generateBtn.setVisible(not busy)
+        self.cancelBtn.setVisible(busy)
+        self.cancelBtn.setDisabled(False)
+
+    def cancelDocx(self):
+        if self.worker and self.worker.isRunning():
+            self.watchPending = False
+            self.cancelBtn.setDisabled(True)
+            self.worker.cancel()
 
     def onDocxDone(self, docx_path):
-        self.progressRing.stop()
-        self.progressRing.hide()
-        self.setDisabled(False)
-
-        folder_path = "\\".join(docx_path.split("/")[:-1])
-        print(folder_path)
-        subprocess.run(["explorer", folder_path])
-        InfoBar.success(
-            title="Done ✅",
-            content=f"DOCX saved to:\n{docx_path}",
-            position=InfoBarPosition.TOP,
-            duration=4000,
-            parent=self,
-        )
+        self.setBusy(False)
+        if self.watchBuild:
+            updated = time.strftime("%H:%M:%S")
+            self.progressLabel.setText(f"Report updated at {updated}")
+        else:
+            self.progressLabel.setText("Done")
+
+            folder_path = "\\".join(docx_path.split("/")[:-1])
+            print(folder_path)
+            subprocess.run(["explorer", folder_path])
+            InfoBar.success(
+                title="Done ✅",
+                content=f"DOCX saved to:\n{docx_path}",
+                position=InfoBarPosition.TOP,
+                duration=4000,
+                parent=self,
+            )
+        self.rebuildIfPending()
 
     def onDocxFail(self, err):
-        self.progressRing.stop()
-        self.progressRing.hide()
-        self.setDisabled(False)
-
-        InfoBar.error(
-            title="Generation Failed 💀",
-            content=str(err),
-            position=InfoBarPosition.TOP,
-            duration=5000,
-            parent=self,
-        )
+        self.progressLabel.setText(str(err))
+        self.setBusy(False)
+        # watch builds don't pop up on every save, the label shows the error
+        if not self.watchBuild:
+            InfoBar.error(
+                title="Generation Failed 💀",
+                content=str(err),
+                position=InfoBarPosition.TOP,
+                duration=5000,
+                parent=self,
+            )
+        self.rebuildIfPending()
+
+    def rebuildIfPending(self):
+        if self.watchPending and self.sourceWatcher.folder:
+            self.watchPending = False
+            self.genWatchDocx()
 
     def openPasteDialog(self):
         # Fluent dialog, but we’ll hide the title bar anyway
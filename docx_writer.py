@@ -0,0 +1,359 @@
+"""
+Report writers. Both lay a report out the same way (headings, monospace code
+paragraphs with highlighted runs, pictures, page breaks):
+
+- PythonDocxWriter builds python-docx's document tree and saves it at the end
+- StreamWriter writes document.xml straight into the zip as sections are
+  added, starting from python-docx's default template
+"""
+
+import hashlib
+import importlib.util
+import io
+import os
+import re
+import sys
+import zipfile
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from highlight import TOKEN_STYLES
+
+WRITERS = ["python-docx", "stream"]
+
+CODE_STYLE = "Code"
+CODE_FONT = "Consolas"
+CODE_SIZE = 9  # pt
+
+EMU_PER_INCH = 914400
+
+CONTENT_TYPES = "[Content_Types].xml"
+DOCUMENT = "word/document.xml"
+DOCUMENT_RELS = "word/_rels/document.xml.rels"
+STYLES = "word/styles.xml"
+
+IMAGE_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+# characters XML 1.0 can't hold, python-docx refuses them; NUL is SEPARATOR
+INVALID_XML = re.compile("[\x01-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+SEPARATOR = "\x00"
+TEXT_OPEN = '<w:t xml:space="preserve">'
+# python-docx turns these into <w:br/> and <w:tab/> inside a run
+BREAK = f"</w:t><w:br/>{TEXT_OPEN}"
+TAB = f"</w:t><w:tab/>{TEXT_OPEN}"
+
+CODE_STYLE_XML = (
+    f'<w:style w:type="paragraph" w:customStyle="1" w:styleId="{CODE_STYLE}">'
+    f'<w:name w:val="{CODE_STYLE}"/><w:basedOn w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:spacing w:after="0" w:line="240" w:lineRule="auto"/></w:pPr>'
+    f'<w:rPr><w:rFonts w:ascii="{CODE_FONT}" w:hAnsi="{CODE_FONT}" w:cs="{CODE_FONT}"/>'
+    f'<w:sz w:val="{CODE_SIZE * 2}"/><w:szCs w:val="{CODE_SIZE * 2}"/></w:rPr>'
+    "</w:style>"
+)
+
+
+def tokenStyle(kind):
+    """Character style of a highlighted token kind, "Code Keyword" etc."""
+    return f"{CODE_STYLE} {kind.title()}"
+
+
+def _styleId(name):
+    return name.replace(" ", "")
+
+
+# one character style per token kind, a run only names its style
+TOKEN_STYLES_XML = "".join(
+    f'<w:style w:type="character" w:customStyle="1" w:styleId="{_styleId(tokenStyle(kind))}">'
+    f'<w:name w:val="{tokenStyle(kind)}"/><w:rPr>{"<w:i/>" if italic else ""}'
+    f'<w:color w:val="{color}"/></w:rPr></w:style>'
+    for kind, (color, italic) in TOKEN_STYLES.items()
+)
+
+PICTURE_XML = (
+    '<w:p><w:r><w:drawing><wp:inline distT="0" distB="0" distL="0" distR="0">'
+    '<wp:extent cx="{cx}" cy="{cy}"/><wp:docPr id="{id}" name="Picture {id}"/>'
+    "<wp:cNvGraphicFramePr>"
+    '<a:graphicFrameLocks xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" noChangeAspect="1"/>'
+    "</wp:cNvGraphicFramePr>"
+    '<a:graphic xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main">'
+    '<a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+    '<pic:pic xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+    '<pic:nvPicPr><pic:cNvPr id="0" name="{name}"/><pic:cNvPicPr/></pic:nvPicPr>'
+    '<pic:blipFill><a:blip r:embed="{rId}"/><a:stretch><a:fillRect/></a:stretch>'
+    "</pic:blipFill>"
+    '<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="rect"/></pic:spPr>'
+    "</pic:pic></a:graphicData></a:graphic></wp:inline></w:drawing></w:r></w:p>"
+)
+
+
+def openWriter(kind, savePath):
+    if kind == "stream":
+        return StreamWriter(savePath)
+    return PythonDocxWriter(savePath)
+
+
+class PythonDocxWriter:
+    def __init__(self, savePath):
+        from docx import Document
+
+        self.savePath = savePath
+        self.document = Document()
+        self._shapeId = self.document.part.next_id
+        self._addCodeStyle()
+
+    def _addCodeStyle(self):
+        from docx.enum.style import WD_STYLE_TYPE
+        from docx.shared import Pt, RGBColor
+
+        styles = self.document.styles
+        style = styles.add_style(CODE_STYLE, WD_STYLE_TYPE.PARAGRAPH)
+        style.base_style = styles["Normal"]
+        style.quick_style = True
+        style.font.name = CODE_FONT
+        style.font.size = Pt(CODE_SIZE)
+        style.paragraph_format.space_after = Pt(0)
+        style.paragraph_format.line_spacing = 1.0
+
+        for kind, (color, italic) in TOKEN_STYLES.items():
+            style = styles.add_style(tokenStyle(kind), WD_STYLE_TYPE.CHARACTER)
+            style.font.color.rgb = RGBColor.from_string(color)
+            if italic:
+                style.font.italic = True
+
+    def addHeading(self, text, level):
+        self.document.add_heading(text, level=level)
+
+    def addParagraph(self, text):
+        self.document.add_paragraph(text)
+
+    def addCode(self, runs):
+        """`runs` as highlight.highlight() returns them"""
+        from docx.oxml import parse_xml
+        from docx.oxml.ns import nsdecls
+
+        paragraph = self.document.add_paragraph(style=CODE_STYLE)
+        # one parse for the whole block, add_run() per token is far slower
+        block = parse_xml(f'<w:p {nsdecls("w")}>{_codeRuns(runs)}</w:p>')
+        paragraph._p.extend(list(block))
+
+    def addPicture(self, imageBuf, width, height):
+        """`width` and `height` in inches"""
+        from docx.oxml.shape import CT_Inline
+        from docx.shared import Inches
+
+        # document.add_picture() finds a free shape id with an XPath over the
+        # whole document, quadratic in long (highlighted) reports; count instead
+        rId, image = self.document.part.get_or_add_image(imageBuf)
+        inline = CT_Inline.new_pic_inline(
+            self._shapeId, rId, image.filename, Inches(width), Inches(height)
+        )
+        self._shapeId += 1
+        self.document.add_paragraph().add_run()._r.add_drawing(inline)
+
+    def addPageBreak(self):
+        self.document.add_page_break()
+
+    def close(self):
+        self.document.save(self.savePath)
+
+    def abort(self):
+        pass
+
+
+def _templatePath():
+    # without importing docx, finding the package is enough
+    spec = importlib.util.find_spec("docx")
+    if spec and spec.submodule_search_locations:
+        path = os.path.join(
+            list(spec.submodule_search_locations)[0], "templates", "default.docx"
+        )
+        if os.path.exists(path):
+            return path
+    return os.path.join(
+        getattr(sys, "_MEIPASS", os.path.abspath(".")),
+        "docx",
+        "templates",
+        "default.docx",
+    )
+
+
+@lru_cache(maxsize=None)
+def _template():
+    """Parts of the default template, document.xml split around its body"""
+    with zipfile.ZipFile(_templatePath()) as zf:
+        parts = {name: zf.read(name) for name in zf.namelist()}
+
+    document = parts.pop(DOCUMENT).decode("utf-8")
+    bodyStart = document.index("<w:body>") + len("<w:body>")
+    sectionStart = document.index("<w:sectPr", bodyStart)
+    parts[STYLES] = parts[STYLES].replace(
+        b"</w:styles>",
+        (CODE_STYLE_XML + TOKEN_STYLES_XML).encode("utf-8") + b"</w:styles>",
+    )
+    return parts, document[:bodyStart], document[sectionStart:]
+
+
+def _runText(text):
+    """
+    Escaped text of a run with python-docx's handling of line breaks and
+    tabs. String replaces rather than splitting into pieces; the empty <w:t/>
+    this leaves between breaks is harmless.
+    """
+    text = escape(INVALID_XML.sub("", text))
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.replace("\n", BREAK).replace("\t", TAB)
+
+
+def _run(text, rPr=""):
+    text = _runText(text.replace(SEPARATOR, ""))
+    return f"<w:r>{rPr}{TEXT_OPEN}{text}</w:t></w:r>"
+
+
+# token kind -> run properties naming its character style
+_RUN_PROPERTIES = {
+    kind: f'<w:rPr><w:rStyle w:val="{_styleId(tokenStyle(kind))}"/></w:rPr>'
+    for kind in TOKEN_STYLES
+}
+_RUN_PROPERTIES[None] = ""
+
+
+def _codeRuns(runs):
+    """
+    XML of highlighted runs. The block is escaped in one go with the runs
+    joined by SEPARATOR and then cut apart again, a block has thousands of
+    runs. Code that contains SEPARATOR itself goes run by run.
+    """
+    texts = [text for _, text in runs]
+    joined = SEPARATOR.join(texts)
+    if joined.count(SEPARATOR) != len(texts) - 1:
+        return "".join(_run(text, _RUN_PROPERTIES[kind]) for kind, text in runs)
+
+    pieces = _runText(joined).split(SEPARATOR)
+    return "".join(
+        f"<w:r>{_RUN_PROPERTIES[kind]}{TEXT_OPEN}{piece}</w:t></w:r>"
+        for (kind, _), piece in zip(runs, pieces)
+    )
+
+
+def _paragraph(text, style=None):
+    style = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    if not text:
+        return f"<w:p>{style}</w:p>"
+    return f"<w:p>{style}{_run(text)}</w:p>"
+
+
+class StreamWriter:
+    """
+    Writes the report into the zip as it goes: template parts first, then
+    document.xml through an open zip entry, then the images and the parts
+    that list them. Only the finished XML text and one copy of each distinct
+    image are held, never a document tree. The file is written next to
+    `savePath` and moved over it on close().
+    """
+
+    def __init__(self, savePath):
+        self.savePath = savePath
+        self._tmpPath = savePath + ".tmp"
+        # sha1 of the PNG -> (relationship id, part name, data), like
+        # python-docx every distinct image is stored once
+        self._media = {}
+        self._pictures = 0
+
+        parts, self._head, self._tail = _template()
+        self._parts = parts
+        self._zip = zipfile.ZipFile(self._tmpPath, "w", zipfile.ZIP_DEFLATED)
+        try:
+            for name, data in parts.items():
+                if name not in (CONTENT_TYPES, DOCUMENT_RELS):
+                    self._zip.writestr(name, data)
+            self._body = io.TextIOWrapper(
+                self._zip.open(DOCUMENT, "w"), encoding="utf-8"
+            )
+            self._body.write(self._head)
+        except BaseException:
+            self.abort()
+            raise
+
+    def addHeading(self, text, level):
+        self._body.write(_paragraph(text, f"Heading{level}"))
+
+    def addParagraph(self, text):
+        self._body.write(_paragraph(text))
+
+    def addCode(self, runs):
+        """`runs` as highlight.highlight() returns them"""
+        self._body.write(
+            f'<w:p><w:pPr><w:pStyle w:val="{CODE_STYLE}"/></w:pPr>{_codeRuns(runs)}</w:p>'
+        )
+
+    def addPicture(self, imageBuf, width, height):
+        """`width` and `height` in inches"""
+        data = imageBuf.getvalue()
+        digest = hashlib.sha1(data).hexdigest()
+        if digest not in self._media:
+            n = len(self._media) + 1
+            self._media[digest] = (f"rIdImg{n}", f"word/media/image{n}.png", data)
+        rId, partName, _ = self._media[digest]
+
+        self._pictures += 1
+        self._body.write(
+            PICTURE_XML.format(
+                cx=int(width * EMU_PER_INCH),
+                cy=int(height * EMU_PER_INCH),
+                id=self._pictures,
+                name=os.path.basename(partName),
+                rId=rId,
+            )
+        )
+
+    def addPageBreak(self):
+        self._body.write('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+
+    def close(self):
+        try:
+            self._body.write(self._tail)
+            self._body.close()
+
+            rels = []
+            for rId, partName, data in self._media.values():
+                # PNGs are compressed already
+                self._zip.writestr(partName, data, compress_type=zipfile.ZIP_STORED)
+                target = partName[len("word/") :]
+                rels.append(
+                    f'<Relationship Id="{rId}" Type="{IMAGE_REL}" Target="{target}"/>'
+                )
+            self._zip.writestr(
+                DOCUMENT_RELS,
+                self._parts[DOCUMENT_RELS].replace(
+                    b"</Relationships>",
+                    "".join(rels).encode("utf-8") + b"</Relationships>",
+                ),
+            )
+
+            contentTypes = self._parts[CONTENT_TYPES]
+            if self._media and b'Extension="png"' not in contentTypes:
+                contentTypes = contentTypes.replace(
+                    b"<Override",
+                    b'<Default Extension="png" ContentType="image/png"/><Override',
+                    1,
+                )
+            self._zip.writestr(CONTENT_TYPES, contentTypes)
+            self._zip.close()
+        except BaseException:
+            self.abort()
+            raise
+        os.replace(self._tmpPath, self.savePath)
+
+    def abort(self):
+        """Drop the half written file, e.g. when the run was cancelled"""
+        for handle in (getattr(self, "_body", None), self._zip):
+            try:
+                if handle:
+                    handle.close()
+            except Exception:
+                pass
+        try:
+            os.remove(self._tmpPath)
+        except OSError:
+            pass
@@ -0,0 +1,66 @@
+import os
+import re
+
+from PyQt5.QtCore import pyqtSignal
+
+from folder_scanner import FolderScanner
+
+NUMBER = re.compile(r"^(\d+)")
+# saves, git and editors touch the folder in bursts, rescan once it settles
+RESCAN_DELAY = 200
+
+
+def scanFolder(folder):
+    """{extension: highest leading number} of the files in `folder`"""
+    highest = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            match = NUMBER.match(entry.name)
+            if match:
+                ext = os.path.splitext(entry.name)[1]
+                highest[ext] = max(highest.get(ext, 0), int(match.group(1)))
+    return highest
+
+
+class FolderIndex(FolderScanner):
+    """
+    Highest numbered file per extension in one folder. Scans run on a
+    background thread and a QFileSystemWatcher keeps the index current, so
+    nextNumber() is a dict lookup.
+    """
+
+    changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(RESCAN_DELAY, parent)
+        # None until the first scan of the folder finished
+        self.highest = None
+
+    def setFolder(self, folder):
+        self.highest = None
+        super().setFolder(folder)
+
+    def nextNumber(self, ext):
+        """Number the next file with `ext` should get, None while still scanning"""
+        if self.highest is None:
+            return None
+        return self.highest.get(ext, 0) + 1
+
+    def noteSaved(self, fileName):
+        """Count a file we just wrote before the watcher gets to it"""
+        match = NUMBER.match(fileName)
+        if match and self.highest is not None:
+            ext = os.path.splitext(fileName)[1]
+            self.highest[ext] = max(self.highest.get(ext, 0), int(match.group(1)))
+            self.changed.emit()
+
+    def scan(self, folder):
+        return scanFolder(folder)
+
+    def scanned(self, highest):
+        # a failed scan keeps what we knew, starting over at 1 would overwrite
+        # the folder's existing files
+        if highest is None:
+            return
+        self.highest = highest
+        self.changed.emit()
@@ -0,0 +1,84 @@
+import threading
+
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+
+class FolderScanner(QObject):
+    """
+    Scans one folder on a background thread, again whenever a watched path
+    changes and the changes settled for `delay` ms. Subclasses implement
+    scan(folder), run on the scan thread, and scanned(result) on the GUI
+    thread, where `result` is None if the folder couldn't be read.
+    """
+
+    _scanned = pyqtSignal(int, object)
+
+    def __init__(self, delay, parent=None):
+        super().__init__(parent)
+        self.folder = None
+        self._generation = 0
+
+        self._watcher = QFileSystemWatcher(self)
+        # new and deleted files change the directory, in-place saves only the file
+        self._watcher.directoryChanged.connect(self._scheduleScan)
+        self._watcher.fileChanged.connect(self._scheduleScan)
+
+        self._scanTimer = QTimer(self)
+        self._scanTimer.setSingleShot(True)
+        self._scanTimer.setInterval(delay)
+        self._scanTimer.timeout.connect(self.rescan)
+
+        self._scanned.connect(self._onScanned)
+
+    def setFolder(self, folder):
+        self.stop()
+        self.folder = folder
+        self._watcher.addPath(folder)
+        self.rescan()
+
+    def stop(self):
+        paths = self._watcher.directories() + self._watcher.files()
+        if paths:
+            self._watcher.removePaths(paths)
+        self._scanTimer.stop()
+        # a scan still running for the old folder is dropped
+        self._generation += 1
+        self.folder = None
+
+    def watchFiles(self, paths):
+        """Watch files of the folder too, editors that replace a file drop it"""
+        watched = set(self._watcher.files())
+        missing = [path for path in paths if path not in watched]
+        if missing:
+            self._watcher.addPaths(missing)
+
+    def rescan(self):
+        if not self.folder:
+            return
+        # results of scans started before this one are thrown away
+        self._generation += 1
+        threading.Thread(
+            target=self._scanThread, args=(self._generation, self.folder), daemon=True
+        ).start()
+
+    def scan(self, folder):
+        raise NotImplementedError
+
+    def scanned(self, result):
+        raise NotImplementedError
+
+    def _scheduleScan(self, _path):
+        self._scanTimer.start()
+
+    def _scanThread(self, generation, folder):
+        try:
+            result = self.scan(folder)
+        except OSError as e:
+            print(f"Could not scan {folder}: {e}")
+            result = None
+        # queued to the GUI thread
+        self._scanned.emit(generation, result)
+
+    def _onScanned(self, generation, result):
+        if generation == self._generation:
+            self.scanned(result)
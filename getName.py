@@ -1,29 +1,251 @@
+import hashlib
+import re
+from collections import Counter, OrderedDict
+
 import pyperclip
 
+import ai_client
+from config_setup import cfg
+
+# below this the local guess is replaced by the model's (if enabled)
+LOCAL_CONFIDENCE = 0.5
+MAX_WORDS = 4
+MEMO_SIZE = 512
+
+_memo = OrderedDict()
+
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+CAMEL = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+# preprocessor lines and shebangs start with # but aren't comments
+HASH_DIRECTIVE = re.compile(
+    r"#\s*(include|define|pragma|if|ifdef|ifndef|endif|else|elif|undef|import|region|endregion)\b|#!"
+)
+COMMENT = re.compile(r"/\*([\s\S]*?)\*/|//([^\n]*)|#([^\n]*)")
+HEADER_LINE = re.compile(
+    r"^\s*(author|name|date|roll|created|class|section|id)\b.*:", re.I
+)
+DEFINITIONS = [
+    re.compile(r"\b(?:class|struct|interface|enum)\s+([A-Za-z_]\w*)"),
+    re.compile(r"\b(?:def|fn|fun|function)\s+([A-Za-z_]\w*)"),
+    # C-like: return type, name, parameters, opening brace
+    re.compile(
+        r"^[ \t]*(?:[\w<>\[\]:,*&]+[ \t]+)+\**([A-Za-z_]\w*)[ \t]*\([^;{)]*\)[ \t\w]*\{",
+        re.M,
+    ),
+]
+
+GENERIC_NAMES = set(
+    "main solution program init run solve input setup test helper if for while "
+    "switch catch else return".split()
+)
+COMMENT_STOPWORDS = set(
+    "a an the to of and in for is it this that on by with from using which given if "
+    "write wap program code find c cpp java python implement create make user "
+    "accept print display enter q que question exp experiment practical aim task "
+    "whether or not".split()
+)
+COMMON_IDENTIFIERS = set(
+    # keywords and standard library names across the configured languages
+    "auto bool break case char const continue default do double else enum extern "
+    "float for goto if int long register return short signed sizeof static struct "
+    "switch typedef union unsigned void volatile while class public private "
+    "protected new delete this true false null nullptr none namespace using std "
+    "include iostream stdio stdlib conio bits stdc string cout cin endl printf "
+    "scanf puts gets getch main def import from print input range len self elif "
+    "pass lambda and or not in is try except finally raise with as let var "
+    "function console log require readline process stdin stdout line lines system "
+    "out println args scanner next nextint java util io throws exception fn mut "
+    "use read unwrap trim parse expect vec push val fun readln tostring toint "
+    "convert write writeline str split map list append println format the to of "
+    "enter number numbers value result ans temp num count size arr array data val "
+    "res sum is get".split()
+)
+
+# known lab problems: slug -> words that give them away
+KEYWORDS = {
+    "factorial": {"factorial", "fact"},
+    "fibonacci": {"fibonacci", "fib", "fibo"},
+    "prime": {"prime", "primes", "isprime"},
+    "palindrome": {"palindrome", "palin"},
+    "armstrong_number": {"armstrong"},
+    "leap_year": {"leap"},
+    "gcd": {"gcd", "hcf"},
+    "lcm": {"lcm"},
+    "swap": {"swap", "swapped"},
+    "reverse": {"reverse", "reversed", "rev"},
+    "bubble_sort": {"bubble"},
+    "selection_sort": {"selection"},
+    "insertion_sort": {"insertion"},
+    "merge_sort": {"merge"},
+    "quick_sort": {"quick", "pivot", "partition"},
+    "binary_search": {"binary", "mid", "low", "high"},
+    "linear_search": {"linear", "search", "found"},
+    "matrix_multiplication": {"matrix", "multiply", "multiplication"},
+    "transpose": {"transpose"},
+    "linked_list": {"node", "linked", "head"},
+    "stack": {"stack", "top", "pop"},
+    "queue": {"queue", "enqueue", "dequeue", "front", "rear"},
+    "vowels": {"vowel", "vowels", "consonant", "consonants"},
+    "even_odd": {"even", "odd"},
+    "largest": {"largest", "greatest", "max", "maximum"},
+    "smallest": {"smallest", "min", "minimum"},
+    "area": {"area", "radius", "perimeter", "circumference"},
+    "temperature_conversion": {"celsius", "fahrenheit"},
+    "simple_interest": {"interest", "principal"},
+    "grade": {"grade", "marks", "percentage"},
+    "calculator": {"calculator", "operator", "add", "subtract", "divide"},
+    "pattern": {"pattern", "pyramid", "triangle", "stars"},
+    "sum_of_digits": {"digits", "digit"},
+    "string_length": {"strlen", "length"},
+    "table": {"table", "multiplication"},
+}
+
+
+def _slug(words):
+    words = [w.lower() for w in words if w]
+    slug = "_".join(words[:MAX_WORDS])
+    return re.sub(r"[^a-z0-9_]+", "", slug)[:40].strip("_")
+
+
+def _words(identifier):
+    """camelCase and snake_case split into lowercase words"""
+    return [w.lower() for part in identifier.split("_") for w in CAMEL.findall(part)]
+
+
+def _leadingComment(code):
+    """Text of the first comment that isn't an author/date header"""
+    text = code.lstrip()
+    docstring = re.match(r'^(?:"""|\'\'\')(.*?)(?:"""|\'\'\')', text, re.S)
+    if docstring:
+        return docstring.group(1)
+
+    for match in COMMENT.finditer(code[:2000]):
+        if match.group(3) is not None and HASH_DIRECTIVE.match(match.group(0)):
+            continue
+        comment = next(g for g in match.groups() if g is not None)
+        lines = [
+            line.strip(" *\t")
+            for line in comment.splitlines()
+            if line.strip(" *\t") and not HEADER_LINE.match(line.strip(" *\t"))
+        ]
+        if lines:
+            return lines[0]
+    return ""
+
+
+def _fromComment(code):
+    words = [
+        w
+        for w in re.findall(r"[A-Za-z]+", _leadingComment(code).lower())
+        if w not in COMMENT_STOPWORDS
+    ]
+    if len(words) >= 2:
+        return _slug(words), 0.9
+    if words:
+        return _slug(words), 0.5
+    return None, 0.0
+
+
+def _fromDefinitions(code):
+    for pattern in DEFINITIONS:
+        for name in pattern.findall(code):
+            if name.lower() not in GENERIC_NAMES and len(name) > 2:
+                return _slug(_words(name)), 0.7
+    return None, 0.0
+
+
+def _fromKeywords(words):
+    present = set(words)
+    best, hits = None, 0
+    for slug, triggers in KEYWORDS.items():
+        found = len(triggers & present)
+        if found > hits:
+            best, hits = slug, found
+    if not best:
+        return None, 0.0
+    # one generic hit (max, high, top) isn't enough on its own
+    return best, min(0.8, 0.3 + 0.15 * hits)
 
-async def get_clipboard_code_name(client):
-    code = pyperclip.paste().strip()
+
+def _fromFrequency(words):
+    counts = Counter(
+        w
+        for w in words
+        if len(w) > 2 and w not in COMMON_IDENTIFIERS and not w.isdigit()
+    )
+    top = [w for w, _ in counts.most_common(2)]
+    return (_slug(top), 0.3) if top else (None, 0.0)
+
+
+def localName(code):
+    """
+    Guess a file name slug from the code itself: its leading comment, the
+    names it defines, known lab problem keywords and its most used
+    identifiers. Returns (slug, confidence between 0 and 1).
+    """
+    words = [w for ident in IDENTIFIER.findall(code) for w in _words(ident)]
+    candidates = [
+        _fromComment(code),
+        _fromDefinitions(code),
+        _fromKeywords(words),
+        _fromFrequency(words),
+    ]
+    slug, confidence = max(candidates, key=lambda c: c[1])
+    return slug, confidence
+
+
+def _remember(key, name):
+    _memo[key] = name
+    _memo.move_to_end(key)
+    if len(_memo) > MEMO_SIZE:
+        _memo.popitem(last=False)
+
+
+async def get_clipboard_code_name(code=None):
+    # queued pastes pass the snapshot taken when Ctrl+V was pressed
+    if code is None:
+        code = pyperclip.paste()
+    code = code.strip()
     if not code:
         return None  # no code in clipboard
 
-    prompt = f"""
-    You are an assistant that names code files.
-    The following code was copied from clipboard:
+    key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+    if key in _memo:
+        _memo.move_to_end(key)
+        return _memo[key]
+
+    name, confidence = localName(code)
+    unsure = confidence < LOCAL_CONFIDENCE or not name
+    if unsure and cfg.aiNames.value and ai_client.configured():
+        try:
+            name = await remoteName(code) or name
+        except Exception as e:
+            # offline or out of quota, the local guess will do
+            print("Error fetching name:", e)
+            return name
+
+    _remember(key, name)
+    return name
 
-    ---
-    {code}
-    ---
 
+NAME_PROMPT = """
+    You are an assistant that names code files.
     Suggest a concise and natural file name (no spaces, just lowercase, underscores or hyphens).
     DO NOT INCLUDE ANY FILE EXTENTION. Just the pure name
     Respond with only the filename, nothing else.
+
+    The following code was copied from clipboard:
     """
 
-    response = await client.responses.create(
+
+async def remoteName(code):
+    # instructions before the code, the same prefix for every paste
+    text = await ai_client.respond(
         model="gpt-4.1-mini",
-        input=prompt,
+        input=f"{NAME_PROMPT}\n---\n{code}\n---\n",
         max_output_tokens=16,
+        prompt_cache_key="savecodex-names",
     )
 
-    name = response.output_text.strip().replace("`", "").replace('"', "")
+    name = text.strip().replace("`", "").replace('"', "")
     return name
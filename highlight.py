@@ -0,0 +1,223 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+# token kind -> (colour, italic); light document background, VS-like colours
+TOKEN_STYLES = {
+    "keyword": ("0000FF", False),
+    "type": ("2B91AF", False),
+    "string": ("A31515", False),
+    "number": ("098658", False),
+    "comment": ("008000", True),
+    "preprocessor": ("6F008A", False),
+}
+MEMO_SIZE = 512
+
+_memo = OrderedDict()
+# batch_docx highlights several folders' sections at once
+_memoLock = threading.Lock()
+
+C_KEYWORDS = (
+    "auto break case const continue default do else enum extern for goto if "
+    "inline register restrict return sizeof static struct switch typedef union "
+    "volatile while true false NULL"
+)
+C_TYPES = "char double float int long short signed unsigned void bool size_t FILE"
+
+# per extension: comment, string and preprocessor patterns, keywords, types,
+# and whether Capitalized names are types too
+LANGUAGES = {
+    ".c": {
+        "comment": r"//[^\n]*|/\*[\s\S]*?(?:\*/|\Z)",
+        "string": r'"(?:\\.|[^"\\\n])*"?|\'(?:\\.|[^\'\\\n])*\'?',
+        "preprocessor": r"#[^\n]*",
+        "keywords": C_KEYWORDS,
+        "types": C_TYPES,
+    },
+    ".cpp": {
+        "comment": r"//[^\n]*|/\*[\s\S]*?(?:\*/|\Z)",
+        "string": r'R"\([\s\S]*?\)"|"(?:\\.|[^"\\\n])*"?|\'(?:\\.|[^\'\\\n])*\'?',
+        "preprocessor": r"#[^\n]*",
+        "keywords": C_KEYWORDS
+        + " catch class constexpr delete explicit friend mutable namespace new "
+        "noexcept nullptr operator override private protected public template "
+        "this throw try typename using virtual and or not",
+        "types": C_TYPES + " string vector map set pair std cin cout endl auto",
+    },
+    ".py": {
+        "comment": r"#[^\n]*",
+        "string": r'[rRbBuUfF]{0,2}(?:"""[\s\S]*?(?:"""|\Z)|\'\'\'[\s\S]*?(?:\'\'\'|\Z)'
+        r'|"(?:\\.|[^"\\\n])*"?|\'(?:\\.|[^\'\\\n])*\'?)',
+        "preprocessor": r"@[\w.]+",
+        "keywords": "and as assert async await break class continue def del elif "
+        "else except finally for from global if import in is lambda nonlocal not "
+        "or pass raise return try while with yield match case True False None self",
+        "types": "int float str bool list dict set tuple bytes object range "
+        "print input len open enumerate zip map",
+        "capitalizedTypes": True,
+    },
+    ".java": {
+        "comment": r"//[^\n]*|/\*[\s\S]*?(?:\*/|\Z)",
+        "string": r'"""[\s\S]*?(?:"""|\Z)|"(?:\\.|[^"\\\n])*"?|\'(?:\\.|[^\'\\\n])*\'?',
+        "preprocessor": r"@\w+",
+        "keywords": "abstract assert break case catch class const continue default "
+        "do else enum extends final finally for goto if implements import "
+        "instanceof interface native new package private protected public return "
+        "static strictfp super switch synchronized this throw throws transient try "
+        "var volatile while true false null record yield",
+        "types": "boolean byte char double float int long short void",
+        "capitalizedTypes": True,
+    },
+    ".js": {
+        "comment": r"//[^\n]*|/\*[\s\S]*?(?:\*/|\Z)",
+        "string": r'`(?:\\.|[^`\\])*`?|"(?:\\.|[^"\\\n])*"?|\'(?:\\.|[^\'\\\n])*\'?',
+        "preprocessor": r"^#![^\n]*",
+        "keywords": "async await break case catch class const continue debugger "
+        "default delete do else export extends finally for function if import in "
+        "instanceof let new of return super switch this throw try typeof var void "
+        "while with yield true false null undefined require",
+        "types": "console process Math Number String Array Object JSON Promise",
+        "capitalizedTypes": True,
+    },
+    ".rs": {
+        "comment": r"//[^\n]*|/\*[\s\S]*?(?:\*/|\Z)",
+        # 'a is a lifetime, only a single (escaped) char in quotes is a literal
+        "string": r'r#*"[\s\S]*?"#*|b?"(?:\\.|[^"\\])*"?|b?\'(?:\\.[^\']*|[^\'\\\n])\'',
+        "preprocessor": r"#!?\[[^\]\n]*\]?|\b\w+!",
+        "keywords": "as async await break const continue crate dyn else enum "
+        "extern false fn for if impl in let loop match mod move mut pub ref return "
+        "self Self static struct super trait true type unsafe use where while",
+        "types": "i8 i16 i32 i64 i128 isize u8 u16 u32 u64 u128 usize f32 f64 bool "
+        "char str",
+        "capitalizedTypes": True,
+    },
+    ".cs": {
+        "comment": r"//[^\n]*|/\*[\s\S]*?(?:\*/|\Z)",
+        "string": r'\$?@"(?:""|[^"])*"?|\$?"(?:\\.|[^"\\\n])*"?|\'(?:\\.|[^\'\\\n])*\'?',
+        "preprocessor": r"#[^\n]*",
+        "keywords": "abstract as base break case catch checked class const continue "
+        "default delegate do else enum event explicit extern false finally fixed "
+        "for foreach goto if implicit in interface internal is lock namespace new "
+        "null operator out override params private protected public readonly ref "
+        "return sealed sizeof stackalloc static struct switch this throw true try "
+        "typeof unchecked unsafe using var virtual volatile while",
+        "types": "bool byte char decimal double float int long object sbyte short "
+        "string uint ulong ushort void",
+        "capitalizedTypes": True,
+    },
+    ".kt": {
+        "comment": r"//[^\n]*|/\*[\s\S]*?(?:\*/|\Z)",
+        "string": r'"""[\s\S]*?(?:"""|\Z)|"(?:\\.|[^"\\\n])*"?|\'(?:\\.|[^\'\\\n])*\'?',
+        "preprocessor": r"@\w+",
+        "keywords": "as break class continue do else false for fun if in "
+        "interface is null object package return super this throw true try "
+        "typealias val var when while import private public internal protected "
+        "override open data sealed companion lateinit const",
+        "types": "Int Long Short Byte Double Float Boolean Char String Unit Any",
+        "capitalizedTypes": True,
+    },
+}
+
+# every token starts with one of these, other positions are skipped quickly
+TOKEN_START = r"(?=[\w\"'`/#@$])"
+NUMBER = r"\b\d\w*(?:\.\d\w*)?"
+# a Capitalized name with a lowercase letter in it, not a CONSTANT
+CAPITALIZED = r"\b[A-Z]\w*?[a-z]\w*"
+
+
+def _words(words):
+    alternatives = "|".join(
+        sorted(map(re.escape, words.split()), key=len, reverse=True)
+    )
+    return rf"\b(?:{alternatives})\b"
+
+
+@lru_cache(maxsize=None)
+def _lexer(extension):
+    """
+    One pattern for the whole language, or None if it's unknown. Keywords and
+    types are matched by the pattern itself, other names are never matched, so
+    the regex engine skips over them instead of a Python loop.
+    """
+    language = LANGUAGES.get(extension)
+    if not language:
+        return None
+    types = _words(language["types"])
+    if language.get("capitalizedTypes"):
+        types += "|" + CAPITALIZED
+    tokens = "|".join(
+        [
+            f"(?P<comment>{language['comment']})",
+            f"(?P<string>{language['string']})",
+            f"(?P<preprocessor>{language['preprocessor']})",
+            f"(?P<number>{NUMBER})",
+            f"(?P<keyword>{_words(language['keywords'])})",
+            f"(?P<type>{types})",
+        ]
+    )
+    return re.compile(f"{TOKEN_START}(?:{tokens})", re.M)
+
+
+def _runs(code, pattern):
+    """
+    (kind or None, text) runs covering all of `code`, as few as look the same:
+    neighbours of one kind are joined, and whitespace (invisible in any colour)
+    joins whatever comes before it.
+    """
+    kinds, texts = [], []
+    pos = 0
+    for match in pattern.finditer(code):
+        start = match.start()
+        if start > pos:
+            gap = code[pos:start]
+            if kinds and (kinds[-1] is None or gap.isspace()):
+                texts[-1].append(gap)
+            else:
+                kinds.append(None)
+                texts.append([gap])
+
+        kind = match.lastgroup
+        if kinds and kinds[-1] == kind:
+            texts[-1].append(match.group())
+        else:
+            kinds.append(kind)
+            texts.append([match.group()])
+        pos = match.end()
+
+    if pos < len(code):
+        gap = code[pos:]
+        if kinds and (kinds[-1] is None or gap.isspace()):
+            texts[-1].append(gap)
+        else:
+            kinds.append(None)
+            texts.append([gap])
+    return tuple(zip(kinds, map("".join, texts)))
+
+
+def highlight(code, extension):
+    """
+    Code as ((token kind or None, text), ...) runs, for a language picked by
+    file extension. Unknown languages come back as one plain run. Results are
+    memoized by source hash, unchanged files in a rerun aren't tokenized again.
+    """
+    pattern = _lexer(extension)
+    if pattern is None or not code:
+        return ((None, code),)
+
+    key = (extension, hashlib.sha256(code.encode("utf-8")).hexdigest())
+    with _memoLock:
+        runs = _memo.get(key)
+        if runs is not None:
+            _memo.move_to_end(key)
+            return runs
+
+    # tokenizing stays outside the lock, two threads may both do the same file
+    runs = _runs(code, pattern)
+    with _memoLock:
+        _memo[key] = runs
+        _memo.move_to_end(key)
+        if len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return runs
@@ -0,0 +1,196 @@
+import re
+from functools import lru_cache
+
+# lines that open a loop or branch, possibly after a closing brace ("} else {")
+CONTROL = re.compile(
+    r"^\s*(?:\}\s*)?(?:for|foreach|while|do|loop|if|else|elif|switch|match|when|case|default)\b"
+)
+LOOP = re.compile(r"^\s*(?:\}\s*)?(?:for|foreach|while|do|loop)\b")
+IF_HEAD = re.compile(r"^\s*if\b")
+ELSE = re.compile(r"^\s*(?:\}\s*)?(?:else|elif)\b")
+# leaving a loop (or the program); in a loop that reads, the condition
+# around it tells the model which input ends the session
+EXIT = re.compile(r"\b(?:break|return|exit|quit)\b")
+DO_WHILE_TAIL = re.compile(r"^\s*\}?\s*while\b.*;\s*$")
+DO_HEAD = re.compile(r"^\s*do\b")
+CASE = re.compile(r"^\s*(?:case|default)\b")
+# string/char literals and line comments, their braces don't count
+NOT_CODE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|//.*')
+
+
+@lru_cache(maxsize=None)
+def _inputPattern(input_calls):
+    return re.compile("|".join(f"(?:{p})" for p in input_calls))
+
+
+def _indent(line):
+    line = line.expandtabs(4)
+    return len(line) - len(line.lstrip())
+
+
+def _braces(line):
+    """The { and } of a line outside of literals and comments"""
+    return [c for c in NOT_CODE.sub("", line) if c in "{}"]
+
+
+def _nextLine(lines, start):
+    """Index of the first non-blank line after `start`, len(lines) if none"""
+    i = start + 1
+    while i < len(lines) and not lines[i].strip():
+        i += 1
+    return i
+
+
+def _braceEnd(lines, start):
+    """Index just past the line that closes the first brace opened from `start`"""
+    depth = 0
+    opened = False
+    for i in range(start, len(lines)):
+        braces = _braces(lines[i])
+        # the } of "} else {" closes the previous block, not this one
+        if i == start and braces[:1] == ["}"]:
+            braces = braces[1:]
+        for brace in braces:
+            depth += 1 if brace == "{" else -1
+            opened = opened or depth > 0
+            if opened and depth <= 0:
+                return i + 1
+    return len(lines)
+
+
+def _caseEnd(lines, start):
+    """Index of the next case label or the } closing the switch"""
+    depth = 0
+    for i in range(start + 1, len(lines)):
+        if depth == 0 and CASE.match(lines[i]):
+            return i
+        for brace in _braces(lines[i]):
+            depth += 1 if brace == "{" else -1
+            if depth < 0:
+                return i
+    return len(lines)
+
+
+def _blockEnd(lines, start):
+    """
+    Index just past the block opened by the header at `start`. Braces decide
+    where there are any, so unindented code and a switch whose case labels
+    line up with it work; otherwise indentation does (Python, brace-less
+    bodies), and an unindented brace-less body is the one statement after
+    the header.
+    """
+    header = _braces(lines[start])
+    if header[:1] == ["}"]:
+        header = header[1:]
+    following = _nextLine(lines, start)
+    if following == len(lines):
+        return following
+    opens = header.count("{") > header.count("}")
+    if opens or lines[following].lstrip().startswith("{"):
+        return _braceEnd(lines, start)
+
+    depth = _indent(lines[start])
+    if _indent(lines[following]) > depth:
+        end = following
+        while end < len(lines):
+            stripped = lines[end].strip()
+            if stripped and _indent(lines[end]) <= depth:
+                break
+            end += 1
+        return end
+
+    if CASE.match(lines[start]):
+        return _caseEnd(lines, start)
+    if lines[start].rstrip().endswith(":"):
+        return start + 1
+    if CONTROL.match(lines[following]) and not DO_WHILE_TAIL.match(lines[following]):
+        return _blockEnd(lines, following)
+    return following + 1
+
+
+def _ifChain(lines, start):
+    """Header indices of the if / else if / else chain starting at `start`"""
+    chain = [start]
+    while True:
+        end = _blockEnd(lines, chain[-1])
+        # "} else {" closes the previous block on its own line
+        following = end - 1
+        if following <= chain[-1] or not lines[following].lstrip().startswith("}"):
+            following = _nextLine(lines, end - 1)
+        if following >= len(lines) or not ELSE.match(lines[following]):
+            return chain
+        sameLevel = _indent(lines[following]) == _indent(lines[chain[-1]])
+        if not (sameLevel or lines[following].lstrip().startswith("}")):
+            return chain
+        chain.append(following)
+
+
+def _withHeaders(lines, wanted):
+    """`wanted` plus every loop or branch header with a wanted line inside"""
+    keep = list(wanted)
+    for i, line in enumerate(lines):
+        if not keep[i] and CONTROL.match(line) and not DO_WHILE_TAIL.match(line):
+            keep[i] = any(wanted[i + 1 : _blockEnd(lines, i)])
+    return keep
+
+
+def extractInputSkeleton(code, input_calls):
+    """
+    Reduce a source file to the lines that read stdin plus the loops and
+    branches around them, keeping the original indentation. Loops that read
+    keep their break/return lines with the conditions around them, and a kept
+    branch keeps the whole if / else if chain it belongs to.
+
+    Returns "" when the file reads nothing.
+    """
+    pattern = _inputPattern(tuple(input_calls))
+    lines = code.splitlines()
+    isInput = [bool(pattern.search(line)) for line in lines]
+    if not any(isInput):
+        return ""
+
+    keep = _withHeaders(lines, isInput)
+    wanted = list(isInput)
+    for i, line in enumerate(lines):
+        if keep[i] and LOOP.match(line) and not DO_WHILE_TAIL.match(line):
+            for j in range(i + 1, _blockEnd(lines, i)):
+                wanted[j] = wanted[j] or bool(EXIT.search(lines[j]))
+    keep = _withHeaders(lines, wanted)
+
+    for i, line in enumerate(lines):
+        if IF_HEAD.match(line):
+            chain = _ifChain(lines, i)
+            if any(keep[j] for j in chain):
+                for j in chain:
+                    keep[j] = True
+
+    # the condition of a do { } while (...); belongs to its kept `do`
+    for i, line in enumerate(lines):
+        if not keep[i] or not DO_HEAD.match(line):
+            continue
+        end = _blockEnd(lines, i)
+        for tail in (end - 1, _nextLine(lines, end - 1)):
+            if i < tail < len(lines) and DO_WHILE_TAIL.match(lines[tail]):
+                keep[tail] = True
+                break
+
+    return "\n".join(line.rstrip() for line, k in zip(lines, keep) if k) + "\n"
+
+
+def splitByInput(filenameCodeDict, input_calls):
+    """
+    Returns (noInput, skeletons): the files that never read stdin, and the
+    input skeleton of every other file for the prompt.
+    Without `input_calls` every file is sent as-is.
+    """
+    if not input_calls:
+        return [], dict(filenameCodeDict)
+
+    noInput, skeletons = [], {}
+    for fileName, code in filenameCodeDict.items():
+        skeleton = extractInputSkeleton(code, input_calls)
+        if skeleton:
+            skeletons[fileName] = skeleton
+        else:
+            noInput.append(fileName)
+    return noInput, skeletons
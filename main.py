@@ -1,5 +1,8 @@
+import os
 import sys
 import asyncio
+import logging
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
 from qasync import QEventLoop
 
@@ -7,6 +10,7 @@ from main_window import Window
 from qfluentwidgets import *
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(name)s: %(message)s")
     app = QApplication(sys.argv)
 
     loop = QEventLoop(app)
@@ -15,5 +19,9 @@ if __name__ == "__main__":
     window = Window()
     window.show()
 
+    # used by bench_startup.py to time launch -> first window, also for builds
+    if os.environ.get("SAVECODEX_EXIT_AFTER_SHOW"):
+        QTimer.singleShot(0, app.quit)
+
     with loop:
         loop.run_forever()
@@ -11,16 +11,10 @@ import code_widget
 import docx_widget
 import settings_widget
 from config_setup import cfg, language_names
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
-client = AsyncOpenAI(api_key=cfg.openai_key.value)
-
-
-qconfig.load("config.json", cfg)
-print(cfg)
 
 
 class Window(FluentWindow):
@@ -34,7 +28,7 @@ class Window(FluentWindow):
 
         # Create sub-interfaces, when actually using, replace Widget with your own sub-interface
         self.makeDocx = docx_widget.DocxWidget()
-        self.saveCodeInterface = code_widget.CodeWidget(client=client)
+        self.saveCodeInterface = code_widget.CodeWidget()
         self.settingInterface = settings_widget.SettingsWidget()
 
         self.initNavigation()
@@ -55,6 +49,11 @@ class Window(FluentWindow):
             NavigationItemPosition.BOTTOM,
         )
 
+    def closeEvent(self, event):
+        # pastes still waiting for their batched commit
+        self.saveCodeInterface.commits.flushNow()
+        super().closeEvent(event)
+
     def initWindow(self):
         self.resize(900, 700)
         self.setWindowIcon(QIcon("app_ico.ico"))
@@ -0,0 +1,167 @@
+import io
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+import runner
+
+COLUMNS = 80
+PADDING = 12
+# images are placed 5 inches wide, drawn so that comes out near TARGET_DPI
+IMAGE_INCHES = 5
+TARGET_DPI = 150
+# steps of antialiasing kept per text colour
+SHADES = 5
+
+BACKGROUND = (12, 12, 12)
+COLORS = {
+    "stdout": (204, 204, 204),
+    "stderr": (231, 72, 86),
+    "stdin": (97, 214, 214),
+}
+
+# first one found wins, Consolas is what the old cmd screenshots used
+FONT_CANDIDATES = [
+    "consola.ttf",
+    "DejaVuSansMono.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf",
+    "LiberationMono-Regular.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationMono-Regular.ttf",
+    "Menlo.ttc",
+    "/System/Library/Fonts/Menlo.ttc",
+]
+
+
+@lru_cache(maxsize=None)
+def _font(size):
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+@lru_cache(maxsize=None)
+def _cellSize(size):
+    font = _font(size)
+    left, top, right, bottom = font.getbbox("M")
+    ascent, descent = font.getmetrics()
+    return max(right, int(font.getlength("M"))), ascent + descent + 2
+
+
+@lru_cache(maxsize=None)
+def fontSize(columns=COLUMNS, dpi=TARGET_DPI):
+    """
+    Largest font size whose console width fits IMAGE_INCHES at `dpi`. Drawing
+    at the final size is sharper and smaller than scaling a bigger image down.
+    """
+    for size in range(32, 8, -1):
+        if _cellSize(size)[0] * columns + PADDING * 2 <= IMAGE_INCHES * dpi:
+            return size
+    return 8
+
+
+@lru_cache(maxsize=None)
+def _palette():
+    """
+    Background, then SHADES steps from the background to each text colour.
+    Console images only ever contain these, so a fixed palette is exact enough
+    and much cheaper than computing one per image.
+    """
+    palette = list(BACKGROUND)
+    for color in COLORS.values():
+        for step in range(1, SHADES + 1):
+            palette += [
+                round(b + (c - b) * step / SHADES) for b, c in zip(BACKGROUND, color)
+            ]
+    image = Image.new("P", (1, 1))
+    image.putpalette(palette)
+    return image
+
+
+@lru_cache(maxsize=4096)
+def _textMask(text, size):
+    """
+    Rendered mask of a run of console text. Prompts and echoed inputs repeat a
+    lot between sessions and files, so whole runs are cached, not just glyphs.
+    """
+    cellW, cellH = _cellSize(size)
+    mask = Image.new("L", (max(1, cellW * len(text)), cellH), 0)
+    ImageDraw.Draw(mask).text((0, 0), text, font=_font(size), fill=255)
+    return mask
+
+
+def _consoleLines(output, columns):
+    """
+    Lay (stream, text) output out like a console: each line is a list of
+    (stream, text) segments, wrapped at `columns`.
+    """
+    lines = [[]]
+    col = 0
+
+    for kind, text in output:
+        text = text.replace("\r\n", "\n").replace("\t", "    ")
+        for i, part in enumerate(text.split("\n")):
+            if i:
+                lines.append([])
+                col = 0
+            while part:
+                take = part[: columns - col]
+                lines[-1].append((kind, take))
+                col += len(take)
+                part = part[len(take) :]
+                if col >= columns:
+                    lines.append([])
+                    col = 0
+
+    while len(lines) > 1 and not "".join(t for _, t in lines[-1]).strip():
+        lines.pop()
+    return lines
+
+
+def renderTranscript(transcript, columns=COLUMNS, size=None):
+    """
+    Draw a captured session like a console window.
+
+    Returns (buffer, (width, height)) where buffer is an in-memory PNG.
+    """
+    # runs that were killed or crashed say so at the bottom, like a console would
+    note = runner.statusMessage(transcript)
+    # sessions often print the same thing (no input, same answers), identical
+    # output is drawn and encoded once
+    output = tuple((kind, text) for _, kind, text in transcript["events"])
+    data, dimensions = _renderPng(output, note, columns, size or fontSize(columns))
+    return io.BytesIO(data), dimensions
+
+
+@lru_cache(maxsize=256)
+def _renderPng(output, note, columns, size):
+    lines = _consoleLines(output, columns)
+    cellW, cellH = _cellSize(size)
+
+    if note:
+        lines += [[], [("stderr", note[:columns])]]
+
+    width = cellW * columns + PADDING * 2
+    height = cellH * len(lines) + PADDING * 2
+    img = Image.new("RGB", (width, height), BACKGROUND)
+
+    for row, segments in enumerate(lines):
+        x, y = PADDING, PADDING + row * cellH
+        for kind, text in segments:
+            if text.strip():
+                img.paste(COLORS[kind], (x, y), _textMask(text, size))
+            x += cellW * len(text)
+
+    # palette index 0 is the background, getbbox() finds the last drawn row
+    img = img.quantize(palette=_palette(), dither=Image.Dither.NONE)
+    bbox = img.getbbox()
+    if bbox and bbox[3] + PADDING < height:
+        height = bbox[3] + PADDING
+        img = img.crop((0, 0, width, height))
+
+    buf = io.BytesIO()
+    dpi = width / IMAGE_INCHES
+    img.save(buf, format="PNG", compress_level=6, dpi=(dpi, dpi))
+    return buf.getvalue(), (width, height)
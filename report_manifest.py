@@ -0,0 +1,114 @@
+import hashlib
+import io
+import json
+import os
+
+# kept inside the folder the report is generated for
+MANIFEST_DIR = ".savecodex"
+MANIFEST_FILE = "manifest.json"
+# 2: palette images at the target DPI, older reports are redone once
+VERSION = 2
+
+
+def _dir(pathStr):
+    return os.path.join(pathStr, MANIFEST_DIR)
+
+
+def sourceHash(code):
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def load(pathStr, settings):
+    """
+    Manifest of the last report for this folder. Anything generated with other
+    compile/run settings is thrown away.
+    """
+    try:
+        with open(
+            os.path.join(_dir(pathStr), MANIFEST_FILE), "r", encoding="utf-8"
+        ) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    if manifest.get("version") != VERSION or manifest.get("settings") != settings:
+        manifest = {"version": VERSION, "settings": settings, "files": {}}
+    return manifest
+
+
+def dataDir(pathStr):
+    """The folder's .savecodex directory, created on first use"""
+    folder = _dir(pathStr)
+    os.makedirs(folder, exist_ok=True)
+
+    # keep the cache out of the folder's own git history (Auto Commit)
+    ignorePath = os.path.join(folder, ".gitignore")
+    if not os.path.exists(ignorePath):
+        with open(ignorePath, "w", encoding="utf-8") as f:
+            f.write("*\n")
+    return folder
+
+
+def save(pathStr, manifest):
+    folder = dataDir(pathStr)
+    tmpPath = os.path.join(folder, MANIFEST_FILE + ".tmp")
+    with open(tmpPath, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmpPath, os.path.join(folder, MANIFEST_FILE))
+
+    prune(pathStr, manifest)
+
+
+def reusableImages(pathStr, manifest, fileName, code, inputs):
+    """
+    Output images of the last report if the file and its input sessions are
+    unchanged, as [(pngBuffer, (width, height)), ...]; otherwise None.
+    """
+    entry = manifest["files"].get(fileName)
+    if not entry or entry["hash"] != sourceHash(code) or entry["inputs"] != inputs:
+        return None
+
+    images = []
+    for image in entry["images"]:
+        try:
+            with open(os.path.join(_dir(pathStr), image["file"]), "rb") as f:
+                images.append((io.BytesIO(f.read()), (image["width"], image["height"])))
+        except OSError:
+            return None
+    return images
+
+
+def record(pathStr, manifest, fileName, code, inputs, images):
+    """Store a freshly captured file's images and remember them in the manifest"""
+    folder = dataDir(pathStr)
+
+    entries = []
+    for imageBuf, (width, height) in images:
+        data = imageBuf.getvalue()
+        name = hashlib.sha256(data).hexdigest()[:24] + ".png"
+        path = os.path.join(folder, name)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(data)
+        entries.append({"file": name, "width": width, "height": height})
+
+    manifest["files"][fileName] = {
+        "hash": sourceHash(code),
+        "inputs": inputs,
+        "images": entries,
+    }
+
+
+def prune(pathStr, manifest):
+    """Delete stored images no file refers to anymore"""
+    used = {
+        image["file"]
+        for entry in manifest["files"].values()
+        for image in entry["images"]
+    }
+    for entry in os.scandir(_dir(pathStr)):
+        if entry.name.endswith(".png") and entry.name not in used:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
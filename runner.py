@@ -0,0 +1,418 @@
+import os
+import queue
+import re
+import shlex
+import signal
+import subprocess
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import pty
+    import termios
+except ImportError:  # Windows
+    pty = termios = None
+
+# how long the output has to stay quiet before the next input line is sent
+SETTLE_TIME = 0.03
+# upper bound on waiting for the program to answer, after start and each line
+LINE_WAIT = 0.5
+
+# Python's input() writes its prompt to stderr when both ends are a terminal;
+# it doesn't need one, PYTHONUNBUFFERED already flushes every print
+PIPE_COMMANDS = re.compile(r"^(pythonw?[\d.]*|py)(\.exe)?$", re.I)
+# Ctrl+D, the end of input on a terminal
+EOF_CHAR = b"\x04"
+
+# wall clock limit for one session, programs waiting on more input than they
+# were given or stuck in a loop end up here
+RUN_TIMEOUT = 10.0
+MAX_OUTPUT = 64 * 1024
+
+# per process limits, applied where the OS supports them (rlimits on Linux/macOS)
+DEFAULT_LIMITS = {
+    "cpu_seconds": 10,
+    "memory_bytes": 1024 * 1024 * 1024,
+    "file_bytes": 16 * 1024 * 1024,
+}
+
+
+class Cancelled(Exception):
+    pass
+
+
+def _reader(stream, name, events, start):
+    for chunk in iter(lambda: stream.read1(4096), b""):
+        events.put((time.perf_counter() - start, name, chunk))
+    stream.close()
+    events.put((time.perf_counter() - start, name, None))
+
+
+def _terminalReader(fd, name, events, start):
+    # reading the master fails with EIO once the program closed its end
+    while True:
+        try:
+            chunk = os.read(fd, 4096)
+        except OSError:
+            break
+        if not chunk:
+            break
+        events.put((time.perf_counter() - start, name, chunk))
+    events.put((time.perf_counter() - start, name, None))
+
+
+def _openTerminal(args):
+    """
+    (master, slave) pty for the program's stdin and stdout, or None to use
+    pipes. C stdio only flushes a prompt before a read on a terminal, on a pipe
+    the whole output arrives at exit, after all of the input.
+    """
+    if pty is None or PIPE_COMMANDS.match(os.path.basename(args[0])):
+        return None
+    master, slave = pty.openpty()
+    attrs = termios.tcgetattr(slave)
+    # keep "\n" as it is, and don't echo: input lines are logged by us
+    attrs[1] &= ~termios.OPOST
+    attrs[3] &= ~termios.ECHO
+    termios.tcsetattr(slave, termios.TCSANOW, attrs)
+    return master, slave
+
+
+def _rlimits(limits):
+    if not resource or not limits:
+        return []
+    pairs = [
+        (getattr(resource, "RLIMIT_CPU", None), limits.get("cpu_seconds")),
+        # RLIMIT_DATA rather than RLIMIT_AS, the JVM and V8 reserve huge
+        # address ranges up front without using them
+        (getattr(resource, "RLIMIT_DATA", None), limits.get("memory_bytes")),
+        (getattr(resource, "RLIMIT_FSIZE", None), limits.get("file_bytes")),
+    ]
+    return [(res, value) for res, value in pairs if res is not None and value]
+
+
+def _applyLimits(proc, limits):
+    """Set rlimits on a started process; prlimit avoids a preexec_fn in threads"""
+    if not hasattr(resource, "prlimit"):
+        return
+    for res, value in _rlimits(limits):
+        try:
+            resource.prlimit(proc.pid, res, (value, value))
+        except (OSError, ValueError):
+            pass
+
+
+def _preexec(limits):
+    # only used where prlimit is missing (macOS), runs in the child before exec
+    rlimits = _rlimits(limits)
+
+    def apply():
+        for res, value in rlimits:
+            try:
+                resource.setrlimit(res, (value, value))
+            except (OSError, ValueError):
+                pass
+
+    return apply
+
+
+def killTree(proc):
+    """Kill the program together with anything it started"""
+    try:
+        if os.name == "nt":
+            if proc.poll() is not None:
+                return
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=subprocess.CREATE_NO_WINDOW,
+            )
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    try:
+        proc.kill()
+    except OSError:
+        pass
+
+
+class _Session:
+    def __init__(self, proc, start, timeout, max_output, cancel, terminal=None):
+        self.proc = proc
+        # pty master for stdin and stdout, None when both are pipes
+        self.terminal = terminal
+        # an input line the program is expected to echo back itself
+        self.echo = ""
+        self.start = start
+        self.deadline = start + timeout if timeout else None
+        self.max_output = max_output
+        self.cancel = cancel
+        self.events = queue.Queue()
+        self.open_streams = {"stdout", "stderr"}
+        self.output_size = 0
+        self.status = "ok"
+        self.transcript = {"events": []}
+
+        readers = [(_reader, proc.stderr, "stderr")]
+        if terminal is None:
+            readers.append((_reader, proc.stdout, "stdout"))
+        else:
+            readers.append((_terminalReader, terminal, "stdout"))
+        for target, stream, name in readers:
+            threading.Thread(
+                target=target, args=(stream, name, self.events, start), daemon=True
+            ).start()
+
+    def stop(self, status):
+        if self.status == "ok":
+            self.status = status
+        killTree(self.proc)
+
+    def check(self):
+        """Enforce cancel/timeout, returns False once the run has been stopped"""
+        if self.status != "ok":
+            return False
+        if self.cancel is not None and self.cancel.is_set():
+            self.stop("cancelled")
+        elif self.deadline and time.perf_counter() > self.deadline:
+            self.stop("timeout")
+        return self.status == "ok"
+
+    def drain(self, timeout):
+        """Move whatever is queued into the transcript, waiting at most `timeout`"""
+        if self.deadline and self.status == "ok":
+            timeout = max(0.0, min(timeout, self.deadline - time.perf_counter()))
+        try:
+            t, name, chunk = self.events.get(timeout=timeout)
+        except queue.Empty:
+            return False
+
+        if chunk is None:
+            self.open_streams.discard(name)
+            return True
+
+        if self.status != "ok":
+            return True
+        self.output_size += len(chunk)
+        if self.max_output and self.output_size > self.max_output:
+            chunk = chunk[: len(chunk) - (self.output_size - self.max_output)]
+            self.stop("output-limit")
+
+        text = chunk.decode("utf-8", "replace")
+        if self.terminal is not None and name == "stdout":
+            text = self._dropEcho(text.replace("\r\n", "\n"))
+            if not text:
+                return True
+        log = self.transcript["events"]
+        # unbuffered programs print in tiny pieces, keep one event per burst
+        if log and log[-1][1] == name:
+            log[-1] = (log[-1][0], name, log[-1][2] + text)
+        else:
+            log.append((t, name, text))
+        return True
+
+    def _dropEcho(self, text):
+        matched = 0
+        for expected, got in zip(self.echo, text):
+            if expected != got:
+                break
+            matched += 1
+        # the whole chunk was echo, the rest of the line may still come
+        self.echo = self.echo[matched:] if matched == len(text) else ""
+        return text[matched:]
+
+    def waitQuiet(self, settle, limit):
+        """
+        Wait until the program printed something and went quiet again (or
+        exited) before typing the next line, at most `limit`. No output yet
+        isn't quiet, slow starting runtimes take a while to print a prompt.
+        Returns whether anything was printed.
+        """
+        until = time.perf_counter() + limit
+        printed = self.output_size
+        while self.open_streams and self.check():
+            left = until - time.perf_counter()
+            if left <= 0:
+                break
+            answered = self.output_size > printed
+            if not self.drain(min(settle, left) if answered else left) and answered:
+                break
+        return self.output_size > printed
+
+    def write(self, line):
+        data = line.encode("utf-8")
+        if self.terminal is None:
+            self.proc.stdin.write(data)
+            self.proc.stdin.flush()
+            return
+        # programs doing their own line editing (node's readline) switch off
+        # canonical mode and echo the line themselves, that echo is dropped
+        if not termios.tcgetattr(self.terminal)[3] & termios.ICANON:
+            self.echo = line
+        while data:
+            data = data[os.write(self.terminal, data) :]
+
+    def closeInput(self):
+        try:
+            if self.terminal is None:
+                self.proc.stdin.close()
+            else:
+                os.write(self.terminal, EOF_CHAR)
+        except OSError:
+            pass
+
+    def finish(self):
+        while self.open_streams:
+            if self.check():
+                self.drain(0.1)
+            elif not self.drain(1.0):
+                # killed but something still holds the pipes open
+                break
+
+
+def runSession(
+    runArgsStr,
+    input_str,
+    cwd=None,
+    settle=SETTLE_TIME,
+    timeout=RUN_TIMEOUT,
+    limits=DEFAULT_LIMITS,
+    max_output=MAX_OUTPUT,
+    cancel=None,
+):
+    """
+    Run `runArgsStr` headless, typing `input_str` one line at a time. On POSIX
+    stdin and stdout are a pty so prompts show up before the input they ask
+    for, stderr and Python's streams are pipes. Windows has no pty here (a
+    ConPTY would need pywinpty), so everything is a pipe: Python still flushes
+    its prompts, but C, C++ and Rust programs fully buffer stdout and their
+    prompts only show up after the input, once the program exits.
+
+    The program is killed (with its whole process group) after `timeout`
+    seconds, once it prints more than `max_output` bytes, or when the
+    `cancel` event is set, in which case Cancelled is raised.
+
+    Returns a transcript dict:
+        events     - [(seconds, "stdin" | "stdout" | "stderr", text), ...] in order
+        returncode - exit code of the program
+        duration   - wall time in seconds
+        status     - "ok", "crashed", "timeout", "output-limit" or "error"
+    """
+    if cancel is not None and cancel.is_set():
+        raise Cancelled()
+
+    args = shlex.split(runArgsStr)
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    terminal = _openTerminal(args)
+    if terminal:
+        # no colours or cursor movement from programs that see a terminal
+        env["TERM"] = "dumb"
+    if os.name == "nt":
+        flags = subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
+        extra = {"creationflags": flags}
+    elif hasattr(resource, "prlimit"):
+        extra = {"start_new_session": True}
+    else:
+        extra = {"start_new_session": True, "preexec_fn": _preexec(limits)}
+
+    stdin = stdout = subprocess.PIPE
+    if terminal:
+        stdin = stdout = terminal[1]
+
+    start = time.perf_counter()
+    try:
+        proc = subprocess.Popen(
+            args,
+            cwd=cwd,
+            env=env,
+            stdin=stdin,
+            stdout=stdout,
+            stderr=subprocess.PIPE,
+            **extra,
+        )
+    except OSError as e:
+        if terminal:
+            os.close(terminal[0])
+        return errorTranscript(f"{args[0]}: {e}\n")
+    finally:
+        if terminal:
+            os.close(terminal[1])
+    _applyLimits(proc, limits)
+
+    master = terminal[0] if terminal else None
+    session = _Session(proc, start, timeout, max_output, cancel, master)
+    waitFirst = LINE_WAIT
+    for line in input_str.splitlines(keepends=True):
+        # programs that read without a prompt aren't waited on again
+        if not session.waitQuiet(settle, waitFirst):
+            waitFirst = settle
+        if not session.check() or proc.poll() is not None:
+            break
+
+        if not line.endswith("\n"):
+            line += "\n"
+        session.transcript["events"].append(
+            (time.perf_counter() - start, "stdin", line)
+        )
+        try:
+            session.write(line)
+        except OSError:
+            break
+
+    session.closeInput()
+    session.finish()
+    try:
+        returncode = proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        killTree(proc)
+        returncode = proc.wait()
+    if master is not None:
+        os.close(master)
+
+    if session.status == "cancelled":
+        raise Cancelled()
+
+    status = session.status
+    # killed by a signal on POSIX, an NTSTATUS error code on Windows
+    if status == "ok" and (returncode < 0 or returncode >= 0xC0000000):
+        status = "crashed"
+
+    transcript = session.transcript
+    transcript["returncode"] = returncode
+    transcript["duration"] = time.perf_counter() - start
+    transcript["status"] = status
+    return transcript
+
+
+def errorTranscript(text, returncode=-1, status="error"):
+    """Transcript for a program that never got to run, e.g. a failed compile"""
+    return {
+        "events": [(0.0, "stderr", text)],
+        "returncode": returncode,
+        "duration": 0.0,
+        "status": status,
+    }
+
+
+def statusMessage(transcript):
+    """Short note for a run that didn't finish normally, None if it did"""
+    status = transcript.get("status", "ok")
+    if status == "timeout":
+        return f"[Timed out after {transcript['duration']:.1f}s, program killed]"
+    if status == "output-limit":
+        return "[Output limit reached, program killed]"
+    if status == "crashed":
+        return f"[Program crashed, exit code {transcript['returncode']}]"
+    return None
+
+
+def transcriptText(transcript):
+    """Plain console view of a transcript, input echoed like a terminal would"""
+    return "".join(text for _, _, text in transcript["events"])
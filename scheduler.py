@@ -0,0 +1,122 @@
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import render
+import runner
+import tracing
+
+log = logging.getLogger(__name__)
+
+MAX_WORKERS = os.cpu_count() or 4
+
+# files a program may expect to find in its working directory
+DATA_EXTENSIONS = {".txt", ".csv", ".dat", ".in", ".json"}
+MAX_DATA_BYTES = 1024 * 1024
+
+
+def _seedScratch(pathStr, scratch):
+    """Copy the folder's small data files so programs that read them still work"""
+    for entry in os.scandir(pathStr):
+        if (
+            entry.is_file()
+            and os.path.splitext(entry.name)[1].lower() in DATA_EXTENSIONS
+            and entry.stat().st_size <= MAX_DATA_BYTES
+        ):
+            shutil.copy2(entry.path, os.path.join(scratch, entry.name))
+
+
+def runCapture(pathStr, fileName, inp, index, run_cmd, compileFuture, cancel, tracer):
+    """
+    One (file, session) job: wait for the file's compile, run the session in a
+    throwaway working directory and render it.
+
+    Returns (image, status): the rendered (pngBuffer, (width, height)) and
+    the transcript status. The image is None for the extra sessions of a file
+    that failed to compile (its first session shows the compiler output).
+    """
+    compileResult = compileFuture.result() if compileFuture else None
+    if compileResult and compileResult["returncode"] != 0:
+        if index:
+            return None, "error"
+        log.warning("Compile failed for %s:\n%s", fileName, compileResult["output"])
+        transcript = runner.errorTranscript(
+            compileResult["output"], compileResult["returncode"]
+        )
+        return _tracedRender(transcript, tracer, fileName, index), "error"
+
+    fileBaseName = "".join(fileName.split(".")[0])
+    runArgsStr = run_cmd.replace("$s", pathStr + fileBaseName)
+
+    # programs that write files must not step on each other
+    scratch = tempfile.mkdtemp(prefix="savecodex-run-")
+    try:
+        _seedScratch(pathStr, scratch)
+        with tracer.span("run", file=fileName, session=index) as attrs:
+            attrs["bytes_in"] = len(inp.encode("utf-8"))
+            transcript = runner.runSession(runArgsStr, inp, cwd=scratch, cancel=cancel)
+            attrs["status"] = transcript["status"]
+            attrs["returncode"] = transcript["returncode"]
+            attrs["bytes_out"] = sum(
+                len(text.encode("utf-8"))
+                for _, stream, text in transcript["events"]
+                if stream != "stdin"
+            )
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if transcript["status"] != "ok":
+        log.warning("%s(%d): %s", fileName, index, transcript["status"])
+    image = _tracedRender(transcript, tracer, fileName, index)
+    return image, transcript["status"]
+
+
+def _tracedRender(transcript, tracer, fileName, index):
+    with tracer.span("render", file=fileName, session=index) as attrs:
+        image = render.renderTranscript(transcript)
+        attrs["bytes_out"] = image[0].getbuffer().nbytes
+    return image
+
+
+def startRuns(
+    pathStr, jobs, run_cmd, compiled, executor, cancel=None, tracer=tracing.NULL
+):
+    """
+    Submit every (file, session) pair at once. `jobs` maps file names to their
+    input sessions, a file without any still gets one run to show its output.
+
+    Returns {fileName: [Future, ...]} in session order.
+    """
+    return {
+        fileName: [
+            executor.submit(
+                runCapture,
+                pathStr,
+                fileName,
+                inp,
+                index,
+                run_cmd,
+                compiled.get(fileName),
+                cancel,
+                tracer,
+            )
+            for index, inp in enumerate(inputs or [""])
+        ]
+        for fileName, inputs in jobs.items()
+    }
+
+
+def collect(futures):
+    """
+    (images, ok) of one file, images in session order, waiting for the ones
+    still running. `ok` is False if it didn't compile or any session failed.
+    """
+    results = [f.result() for f in futures]
+    images = [image for image, _ in results if image is not None]
+    return images, all(status == "ok" for _, status in results)
+
+
+def runPool(workers=MAX_WORKERS):
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="run")
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+from utils import cacheDir
+
+DB_FILE = "sessions.sqlite3"
+
+
+def _connect():
+    conn = sqlite3.connect(os.path.join(cacheDir(), DB_FILE), timeout=10)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sessions (key TEXT PRIMARY KEY, inputs TEXT NOT NULL)"
+    )
+    return conn
+
+
+def sessionKey(extension, code, version):
+    h = hashlib.sha256()
+    for part in (version, extension, code):
+        data = part.encode("utf-8")
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+def isValidSessions(inputs):
+    return isinstance(inputs, list) and all(isinstance(i, str) for i in inputs)
+
+
+def lookup(extension, filenameCodeDict, version):
+    """
+    Split files into the ones whose input sessions are already known and the
+    ones that still need the model.
+
+    Returns (hits, misses): {fileName: [session, ...]} and {fileName: code}.
+    """
+    keys = {
+        fileName: sessionKey(extension, code, version)
+        for fileName, code in filenameCodeDict.items()
+    }
+
+    with _connect() as conn:
+        rows = dict(
+            conn.execute(
+                f"SELECT key, inputs FROM sessions WHERE key IN ({','.join('?' * len(keys))})",
+                list(keys.values()),
+            ).fetchall()
+            if keys
+            else []
+        )
+    conn.close()
+
+    hits, misses = {}, {}
+    for fileName, code in filenameCodeDict.items():
+        if keys[fileName] in rows:
+            hits[fileName] = json.loads(rows[keys[fileName]])
+        else:
+            misses[fileName] = code
+    return hits, misses
+
+
+def store(extension, filenameCodeDict, response, version):
+    """Remember the sessions in `response` for every file that has valid ones"""
+    rows = [
+        (sessionKey(extension, code, version), json.dumps(response[fileName]))
+        for fileName, code in filenameCodeDict.items()
+        if isValidSessions(response.get(fileName))
+    ]
+    if not rows:
+        return
+
+    with _connect() as conn:
+        conn.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?)", rows)
+    conn.close()
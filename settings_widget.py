@@ -7,12 +7,6 @@ from qfluentwidgets import FluentIcon as FIF
 from config_setup import cfg, language_names
 
 
-# right after creating self.langGroup:
-
-
-qconfig.load("settings_config.json", cfg, autoSave=True)
-
-
 class SettingsWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -61,7 +55,28 @@ class SettingsWidget(QWidget):
         self.apiKeyEdit.setText(cfg.openai_key.value)
         self.apiKeyCard.hBoxLayout.addWidget(self.apiKeyEdit)
 
+        self.baseUrlCard = SettingCard(
+            icon=FIF.GLOBE,
+            title="OpenAI Base URL",
+            content="Leave empty for api.openai.com, or point at a compatible server.",
+            parent=self.apiGroup,
+        )
+        self.baseUrlEdit = LineEdit(self)
+        self.baseUrlEdit.setPlaceholderText("https://api.openai.com/v1")
+        self.baseUrlEdit.setText(cfg.openai_base_url.value)
+        self.baseUrlCard.hBoxLayout.addWidget(self.baseUrlEdit)
+
+        self.aiNamesCard = SwitchSettingCard(
+            icon=FIF.ROBOT,
+            title="AI File Names",
+            content="Ask OpenAI for a name when the offline namer isn't sure.",
+            configItem=cfg.aiNames,
+            parent=self.apiGroup,
+        )
+
         self.apiGroup.addSettingCard(self.apiKeyCard)
+        self.apiGroup.addSettingCard(self.baseUrlCard)
+        self.apiGroup.addSettingCard(self.aiNamesCard)
         contentLayout.addWidget(self.apiGroup)
 
         # --- DOCX Section ---
@@ -84,6 +99,31 @@ class SettingsWidget(QWidget):
             parent=self.docxGroup,
         )
 
+        self.chromeTraceCard = SwitchSettingCard(
+            icon=FIF.SPEED_HIGH,
+            title="Chrome Trace",
+            content="Also save .savecodex/trace.json for chrome://tracing or Perfetto.",
+            configItem=cfg.chromeTrace,
+            parent=self.docxGroup,
+        )
+
+        self.highlightCard = SwitchSettingCard(
+            icon=FIF.PALETTE,
+            title="Syntax Highlighting",
+            content="Colour keywords, strings and comments in the code sections.",
+            configItem=cfg.highlightCode,
+            parent=self.docxGroup,
+        )
+
+        self.writerCard = ComboBoxSettingCard(
+            cfg.docxWriter,
+            icon=FIF.DOCUMENT,
+            title="DOCX Writer",
+            content="Stream writes large reports faster and with less memory.",
+            texts=["python-docx", "Stream"],
+            parent=self.docxGroup,
+        )
+
         # --- Heading text ---
         self.headingCard = SettingCard(
             icon=FIF.QUICK_NOTE,
@@ -111,6 +151,9 @@ class SettingsWidget(QWidget):
         # Add everything
         self.docxGroup.addSettingCard(self.defaultLangCard)
         self.docxGroup.addSettingCard(self.pageBreakCard)
+        self.docxGroup.addSettingCard(self.chromeTraceCard)
+        self.docxGroup.addSettingCard(self.highlightCard)
+        self.docxGroup.addSettingCard(self.writerCard)
         self.docxGroup.addSettingCard(self.headingCard)
         self.docxGroup.addSettingCard(self.paragraphCard)
 
@@ -167,10 +210,7 @@ class SettingsWidget(QWidget):
         self.updateLangSettings(cfg.language.value)
 
     def getLangConfig(self, langName):
-        for lang in cfg.languages.value:
-            if lang["name"] == langName:
-                return lang
-        return None
+        return cfg.languageConfig(langName)
 
     def updateLangSettings(self, langName):
         # clear container (only widgets inside langSettingsContainer)
@@ -222,6 +262,7 @@ class SettingsWidget(QWidget):
         cfg.heading.value = self.headingEdit.text()
         cfg.paragraph.value = self.paragraphEdit.text()
         cfg.openai_key.value = self.apiKeyEdit.text().strip()
+        cfg.openai_base_url.value = self.baseUrlEdit.text().strip()
         cfg.language.value = langName
         cfg.languages.value = cfg.languages.value  # trigger save
         cfg.save()
@@ -0,0 +1,56 @@
+import os
+
+from PyQt5.QtCore import pyqtSignal
+
+from folder_scanner import FolderScanner
+
+# a paste is saved, then renamed once it has a name; wait for the burst to end
+WATCH_DELAY = 1500
+
+
+def sourceSignature(folder, extension):
+    """{file name: (mtime, size)} of the source files in `folder`"""
+    signature = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.endswith(extension) and entry.is_file():
+                stat = entry.stat()
+                signature[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return signature
+
+
+class SourceWatcher(FolderScanner):
+    """
+    Emits `changed` once source files with the watched extension were added,
+    removed or saved and the folder has been quiet for WATCH_DELAY. Reports,
+    compiled programs and the .savecodex cache written into the same folder
+    don't count.
+    """
+
+    changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(WATCH_DELAY, parent)
+        self.extension = None
+        self.signature = None
+
+    def watch(self, folder, extension):
+        """Start watching; the first scan emits `changed` so the report catches up"""
+        self.signature = None
+        self.extension = extension
+        self.setFolder(folder)
+
+    def stop(self):
+        super().stop()
+        self.signature = None
+
+    def scan(self, folder):
+        return sourceSignature(folder, self.extension)
+
+    def scanned(self, signature):
+        if signature is None:
+            return
+        self.watchFiles([os.path.join(self.folder, name) for name in signature])
+        if signature != self.signature:
+            self.signature = signature
+            self.changed.emit()
@@ -0,0 +1,135 @@
+import json
+import unittest
+from unittest import mock
+
+import openai
+
+import ai_sessions
+
+
+def buildPrompt(extension, chunk):
+    return json.dumps(list(chunk))
+
+
+def statusError(cls, status):
+    response = mock.Mock(status_code=status, headers={}, request=None)
+    return cls("error", response=response, body=None)
+
+
+class FakeClient:
+    """Answers each prompt (a JSON list of file names) through `reply(files)`"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+        self.responses = self
+
+    async def create(self, model, input, **_):
+        files = json.loads(input)
+        self.prompts.append(files)
+        answer = self.reply(files)
+        if isinstance(answer, Exception):
+            raise answer
+        return mock.Mock(output_text=answer)
+
+
+def sessionsFor(files):
+    return json.dumps({fileName: [fileName + " input"] for fileName in files})
+
+
+class ChunkFilesTest(unittest.TestCase):
+    def test_keeps_order_within_budget(self):
+        files = {f"{i}.c": "x" * 400 for i in range(1, 6)}
+
+        chunks = ai_sessions.chunkFiles(files, budget=250)
+
+        self.assertEqual(
+            [list(chunk) for chunk in chunks], [["1.c", "2.c"], ["3.c", "4.c"], ["5.c"]]
+        )
+
+    def test_oversized_file_gets_its_own_chunk(self):
+        files = {"1.c": "x", "2.c": "x" * 4000, "3.c": "x"}
+
+        chunks = ai_sessions.chunkFiles(files, budget=100)
+
+        self.assertEqual([list(chunk) for chunk in chunks], [["1.c"], ["2.c"], ["3.c"]])
+
+
+class ParseReplyTest(unittest.TestCase):
+    def test_fenced_json(self):
+        text = '```json\n{"1.c": ["5\\n"], "2.c": []}\n```'
+
+        self.assertEqual(
+            ai_sessions.parseReply(text, ["1.c", "2.c"]),
+            ({"1.c": ["5\n"], "2.c": []}, []),
+        )
+
+    def test_missing_and_malformed_entries_fail(self):
+        text = '{"1.c": ["5\\n"], "2.c": [5], "3.c": "5"}'
+
+        self.assertEqual(
+            ai_sessions.parseReply(text, ["1.c", "2.c", "3.c", "4.c"]),
+            ({"1.c": ["5\n"]}, ["2.c", "3.c", "4.c"]),
+        )
+
+    def test_not_json(self):
+        self.assertEqual(
+            ai_sessions.parseReply("Sure! Here are the inputs", ["1.c"]), ({}, ["1.c"])
+        )
+        self.assertEqual(ai_sessions.parseReply('["5"]', ["1.c"]), ({}, ["1.c"]))
+
+
+class GenerateSessionsTest(unittest.TestCase):
+    def generate(self, client, files):
+        return ai_sessions.generateSessionsSync(".c", files, buildPrompt, client=client)
+
+    def test_invalid_sessions_are_asked_again_alone(self):
+        def reply(files):
+            if len(files) > 1:
+                return json.dumps({"1.c": ["1"], "2.c": "oops", "3.c": ["3"]})
+            return sessionsFor(files)
+
+        client = FakeClient(reply)
+
+        sessions = self.generate(client, {"1.c": "", "2.c": "", "3.c": ""})
+
+        self.assertEqual(sessions, {"1.c": ["1"], "2.c": ["2.c input"], "3.c": ["3"]})
+        self.assertEqual(client.prompts, [["1.c", "2.c", "3.c"], ["2.c"]])
+
+    def test_gives_up_after_the_reask_rounds(self):
+        client = FakeClient(lambda files: "not json")
+
+        sessions = self.generate(client, {"1.c": ""})
+
+        self.assertEqual(sessions, {})
+        self.assertEqual(len(client.prompts), ai_sessions.REASK_ROUNDS + 1)
+
+    def test_retryable_errors_are_retried(self):
+        errors = [statusError(openai.RateLimitError, 429)]
+        client = FakeClient(
+            lambda files: errors.pop() if errors else sessionsFor(files)
+        )
+
+        with mock.patch.object(ai_sessions.asyncio, "sleep", mock.AsyncMock()):
+            sessions = self.generate(client, {"1.c": ""})
+
+        self.assertEqual(sessions, {"1.c": ["1.c input"]})
+        self.assertEqual(len(client.prompts), 2)
+
+    def test_non_retryable_error_means_no_sessions_for_the_chunk(self):
+        def reply(files):
+            if "2.c" in files:
+                return statusError(openai.AuthenticationError, 401)
+            return sessionsFor(files)
+
+        client = FakeClient(reply)
+
+        with mock.patch.object(ai_sessions, "CHUNK_TOKENS", 10):
+            sessions = self.generate(client, {"1.c": "", "2.c": "", "3.c": ""})
+
+        self.assertEqual(sessions, {"1.c": ["1.c input"], "3.c": ["3.c input"]})
+        self.assertEqual(client.prompts, [["1.c"], ["2.c"], ["3.c"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+
+import build
+import runner
+
+HELLO_C = '#include <stdio.h>\nint main() { printf("hello\\n"); return 0; }\n'
+
+HELLO_JAVA = """
+public class Main {
+    static class Node {
+        int value = 6;
+    }
+
+    public static void main(String[] args) {
+        System.out.println(Helper.twice(new Node().value));
+    }
+}
+
+class Helper {
+    static int twice(int x) {
+        return 2 * x;
+    }
+}
+"""
+
+# writes what javac would for HELLO_JAVA, plus a class of another source
+FAKE_JAVAC = textwrap.dedent(
+    """
+    import os, sys
+
+    def classFile(source):
+        name = source.encode()
+        return (
+            b"\\xca\\xfe\\xba\\xbe\\x01\\x00\\x0aSourceFile"
+            + b"\\x01" + len(name).to_bytes(2, "big") + name
+        )
+
+    folder = os.path.dirname(sys.argv[1])
+    for name in ("Main.class", "Main$Node.class", "Helper.class"):
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(classFile("Main.java"))
+    with open(os.path.join(folder, "Other.class"), "wb") as f:
+        f.write(classFile("Other.java"))
+    """
+)
+
+
+class BuildCacheTest(unittest.TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp(prefix="savecodex-test-")
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        patcher = mock.patch.dict(
+            os.environ,
+            {"XDG_CACHE_HOME": os.path.join(root, "cache"), "LOCALAPPDATA": root},
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.folder = os.path.join(root, "lab")
+        self.copy = os.path.join(root, "copy")
+        os.makedirs(self.folder)
+
+    def write(self, fileName, source):
+        with open(os.path.join(self.folder, fileName), "w", encoding="utf-8") as f:
+            f.write(source)
+
+    def copySources(self, *fileNames):
+        """A clean copy of the folder, only the sources and no artifacts"""
+        os.makedirs(self.copy)
+        for fileName in fileNames:
+            shutil.copy2(os.path.join(self.folder, fileName), self.copy)
+        return self.copy + "/"
+
+    def test_every_class_of_the_source_is_cached(self):
+        script = os.path.join(self.folder, "..", "fake_javac.py")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(FAKE_JAVAC)
+        self.write("Main.java", HELLO_JAVA)
+        compile_cmd = f'"{sys.executable}" "{script}" "$s.java"'
+
+        first = build.compileFile(self.folder + "/", "Main.java", compile_cmd)
+        copy = self.copySources("Main.java")
+        second = build.compileFile(copy, "Main.java", compile_cmd)
+
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(
+            sorted(os.listdir(copy)),
+            ["Helper.class", "Main$Node.class", "Main.class", "Main.java"],
+        )
+
+    @unittest.skipUnless(shutil.which("gcc"), "needs gcc")
+    def test_cached_program_runs(self):
+        self.write("1.c", HELLO_C)
+        compile_cmd = 'gcc "$s.c" -o "$s.exe"'
+
+        build.compileFile(self.folder + "/", "1.c", compile_cmd)
+        copy = self.copySources("1.c")
+        result = build.compileFile(copy, "1.c", compile_cmd)
+        transcript = runner.runSession(f'"{copy}1.exe"', "")
+
+        self.assertTrue(result["cached"])
+        self.assertEqual(transcript["status"], "ok")
+        self.assertEqual(runner.transcriptText(transcript), "hello\n")
+
+    @unittest.skipUnless(shutil.which("gcc"), "needs gcc")
+    def test_identical_sources_under_two_names(self):
+        self.write("1.c", HELLO_C)
+        self.write("2.c", HELLO_C)
+        compile_cmd = 'gcc "$s.c" -o "$s.exe"'
+
+        first = build.compileFile(self.folder + "/", "1.c", compile_cmd)
+        second = build.compileFile(self.folder + "/", "2.c", compile_cmd)
+        transcript = runner.runSession(f'"{self.folder}/2.exe"', "")
+
+        self.assertFalse(first["cached"])
+        self.assertFalse(second["cached"])
+        self.assertEqual(runner.transcriptText(transcript), "hello\n")
+
+    @unittest.skipUnless(shutil.which("gcc"), "needs gcc")
+    def test_edited_header_is_rebuilt(self):
+        self.write("greeting.h", '#define GREETING "hello"\n')
+        self.write(
+            "1.c",
+            '#include <stdio.h>\n#include "greeting.h"\n'
+            "int main() { puts(GREETING); return 0; }\n",
+        )
+        compile_cmd = 'gcc "$s.c" -o "$s.exe"'
+
+        build.compileFile(self.folder + "/", "1.c", compile_cmd)
+        self.write("greeting.h", '#define GREETING "bye"\n')
+        result = build.compileFile(self.folder + "/", "1.c", compile_cmd)
+        transcript = runner.runSession(f'"{self.folder}/1.exe"', "")
+
+        self.assertFalse(result["cached"])
+        self.assertEqual(runner.transcriptText(transcript), "bye\n")
+
+    @unittest.skipUnless(
+        shutil.which("javac") and shutil.which("java"), "needs a JDK"
+    )
+    def test_cached_java_program_runs(self):
+        self.write("Main.java", HELLO_JAVA)
+        compile_cmd = 'javac "$s.java"'
+
+        build.compileFile(self.folder + "/", "Main.java", compile_cmd)
+        copy = self.copySources("Main.java")
+        result = build.compileFile(copy, "Main.java", compile_cmd)
+        transcript = runner.runSession(f'java -cp "{copy}" Main', "")
+
+        self.assertTrue(result["cached"])
+        self.assertEqual(transcript["status"], "ok")
+        self.assertEqual(runner.transcriptText(transcript), "12\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
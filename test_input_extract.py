@@ -0,0 +1,191 @@
+import json
+import os
+import unittest
+
+from input_extract import extractInputSkeleton, splitByInput
+
+with open(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "languages.json"),
+    encoding="utf-8",
+) as f:
+    CALLS = {lang["name"]: lang["input_calls"] for lang in json.load(f)}
+
+
+def skeleton(code, language="C"):
+    return extractInputSkeleton(code, CALLS[language]).splitlines()
+
+
+class InputSkeletonTest(unittest.TestCase):
+    def test_no_input(self):
+        self.assertEqual(
+            extractInputSkeleton('int main() { puts("hi"); }\n', CALLS["C"]), ""
+        )
+
+    def test_switch_with_case_labels_at_its_indent(self):
+        code = """
+do {
+    scanf("%d", &c);
+    switch (c)
+    {
+    case 1:
+        scanf("%d", &a);
+        break;
+    case 2:
+        printf("x");
+    }
+} while (c != 0);
+"""
+        self.assertEqual(
+            skeleton(code),
+            [
+                "do {",
+                '    scanf("%d", &c);',
+                "    switch (c)",
+                "    case 1:",
+                '        scanf("%d", &a);',
+                "        break;",
+                "} while (c != 0);",
+            ],
+        )
+
+    def test_unindented_code_keeps_its_loops(self):
+        code = """
+for(i=0;i<n;i++){
+while(1)
+scanf("%d",&x);
+}
+"""
+        self.assertEqual(
+            skeleton(code), ["for(i=0;i<n;i++){", "while(1)", 'scanf("%d",&x);']
+        )
+
+    def test_c_sentinel_keeps_the_break_condition(self):
+        code = """
+while (1) {
+    printf("Enter a number (0 to stop): ");
+    scanf("%d", &x);
+    if (x == 0) {
+        break;
+    }
+    count++;
+}
+"""
+        self.assertEqual(
+            skeleton(code),
+            [
+                "while (1) {",
+                '    scanf("%d", &x);',
+                "    if (x == 0) {",
+                "        break;",
+            ],
+        )
+
+    def test_python_sentinel_keeps_the_break_condition(self):
+        code = """
+while True:
+    x = int(input("Enter a number (0 to stop): "))
+    if x == 0:
+        break
+    count += 1
+print(count)
+"""
+        self.assertEqual(
+            skeleton(code, "Python"),
+            [
+                "while True:",
+                '    x = int(input("Enter a number (0 to stop): "))',
+                "    if x == 0:",
+                "        break",
+            ],
+        )
+
+    def test_rust_loop_keeps_its_exit(self):
+        code = """
+loop {
+    let mut line = String::new();
+    io::stdin().read_line(&mut line).unwrap();
+    let x: i32 = line.trim().parse().unwrap();
+    if x == 0 { break; }
+}
+"""
+        self.assertEqual(
+            skeleton(code, "Rust"),
+            [
+                "loop {",
+                "    io::stdin().read_line(&mut line).unwrap();",
+                "    if x == 0 { break; }",
+            ],
+        )
+
+    def test_break_outside_a_reading_loop_is_dropped(self):
+        code = """
+scanf("%d", &n);
+for (i = 0; i < 10; i++) {
+    if (i == n) {
+        break;
+    }
+}
+"""
+        self.assertEqual(skeleton(code), ['scanf("%d", &n);'])
+
+    def test_else_keeps_its_if(self):
+        code = """
+if (mode == 1) {
+    printf("one");
+} else if (mode == 2) {
+    printf("two");
+} else {
+    scanf("%d", &x);
+}
+"""
+        self.assertEqual(
+            skeleton(code),
+            [
+                "if (mode == 1) {",
+                "} else if (mode == 2) {",
+                "} else {",
+                '    scanf("%d", &x);',
+            ],
+        )
+
+    def test_python_nested_chains_keep_their_headers(self):
+        code = """
+if a:
+    if b:
+        print(1)
+    elif c:
+        x = input()
+    print(3)
+else:
+    print(2)
+"""
+        self.assertEqual(
+            skeleton(code, "Python"),
+            ["if a:", "    if b:", "    elif c:", "        x = input()", "else:"],
+        )
+
+    def test_java_scanner_calls_but_not_iterators(self):
+        code = """
+Scanner sc = new Scanner(System.in);
+int n = sc.nextInt();
+String word = sc.next();
+Iterator<Integer> it = list.iterator();
+while (it.hasNext()) {
+    total += it.next();
+}
+"""
+        self.assertEqual(
+            skeleton(code, "Java"),
+            ["int n = sc.nextInt();", "String word = sc.next();"],
+        )
+
+    def test_split_by_input(self):
+        noInput, skeletons = splitByInput(
+            {"1.c": 'puts("hi");\n', "2.c": 'scanf("%d", &n);\n'}, CALLS["C"]
+        )
+        self.assertEqual(noInput, ["1.c"])
+        self.assertEqual(skeletons, {"2.c": 'scanf("%d", &n);\n'})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import runner
+
+SCANF_PROGRAM = r"""
+#include <stdio.h>
+
+int main() {
+    int n, x, sum = 0;
+    printf("Enter n: ");
+    scanf("%d", &n);
+    for (int i = 1; i <= n; i++) {
+        printf("Enter number %d: ", i);
+        x = 0;
+        scanf("%d", &x);
+        sum += x;
+    }
+    printf("Sum = %d\n", sum);
+    return 0;
+}
+"""
+
+COMPILER = shutil.which("gcc") or shutil.which("cc")
+
+
+@unittest.skipUnless(COMPILER and runner.pty, "needs a C compiler and a pty")
+class ScanfSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="savecodex-test-")
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        source = os.path.join(self.folder, "sum.c")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(SCANF_PROGRAM)
+        self.program = os.path.join(self.folder, "sum.exe")
+        subprocess.run([COMPILER, source, "-o", self.program], check=True)
+
+    def test_prompts_come_before_their_input(self):
+        transcript = runner.runSession(f'"{self.program}"', "3\n1\n2\n3\n")
+
+        self.assertEqual(transcript["status"], "ok")
+        self.assertEqual(
+            [(stream, text) for _, stream, text in transcript["events"]],
+            [
+                ("stdout", "Enter n: "),
+                ("stdin", "3\n"),
+                ("stdout", "Enter number 1: "),
+                ("stdin", "1\n"),
+                ("stdout", "Enter number 2: "),
+                ("stdin", "2\n"),
+                ("stdout", "Enter number 3: "),
+                ("stdin", "3\n"),
+                ("stdout", "Sum = 6\n"),
+            ],
+        )
+
+    def test_missing_input_ends_the_program(self):
+        transcript = runner.runSession(f'"{self.program}"', "2\n5\n")
+
+        self.assertEqual(transcript["status"], "ok")
+        self.assertEqual(
+            runner.transcriptText(transcript),
+            "Enter n: 2\nEnter number 1: 5\nEnter number 2: Sum = 5\n",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
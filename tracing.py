@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+
+class Tracer:
+    """
+    Collects timed spans from any thread of the report pipeline.
+
+    `listener(event, record)` is called with "start" and "end" for every span,
+    from whichever thread ran it, e.g. to drive a progress view.
+    """
+
+    def __init__(self, listener=None):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.listener = listener
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        start = time.perf_counter()
+        record = {
+            "name": name,
+            "start": start - self.origin,
+            "duration": None,
+            "thread": threading.current_thread().name,
+            "attrs": attrs,
+        }
+        self._notify("start", record)
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = type(e).__name__
+            raise
+        finally:
+            record["duration"] = time.perf_counter() - start
+            with self._lock:
+                self.spans.append(record)
+            self._notify("end", record)
+
+    def _notify(self, event, record):
+        if self.listener:
+            try:
+                self.listener(event, record)
+            except Exception as e:
+                # a broken progress view must not break the report
+                log.warning("Trace listener failed: %s", e)
+
+    def totals(self):
+        """Summed duration per span name, threads add up (compile/run/render)"""
+        totals = {}
+        with self._lock:
+            for record in self.spans:
+                totals[record["name"]] = (
+                    totals.get(record["name"], 0.0) + record["duration"]
+                )
+        return totals
+
+    def writeJsonl(self, path):
+        """One span per line, in the order they finished"""
+        with self._lock:
+            spans = list(self.spans)
+        _atomicWrite(
+            path, "".join(json.dumps(span, default=str) + "\n" for span in spans)
+        )
+
+    def writeChromeTrace(self, path):
+        """Trace Event Format, opens in chrome://tracing and Perfetto"""
+        with self._lock:
+            spans = list(self.spans)
+
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for span in spans:
+            tid = threads.setdefault(span["thread"], len(threads))
+            events.append(
+                {
+                    "name": (
+                        f"{span['name']} {span['attrs']['file']}"
+                        if "file" in span["attrs"]
+                        else span["name"]
+                    ),
+                    "cat": span["name"],
+                    "ph": "X",
+                    "ts": span["start"] * 1e6,
+                    "dur": span["duration"] * 1e6,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": span["attrs"],
+                }
+            )
+        for name, tid in threads.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+            )
+        _atomicWrite(path, json.dumps({"traceEvents": events}, default=str))
+
+
+def _atomicWrite(path, text):
+    tmpPath = path + ".tmp"
+    with open(tmpPath, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmpPath, path)
+
+
+class _NullTracer:
+    @contextmanager
+    def span(self, name, **attrs):
+        yield attrs
+
+
+NULL = _NullTracer()
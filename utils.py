@@ -1,3 +1,4 @@
+import asyncio
 import os
 import subprocess
 import sys
@@ -15,16 +16,83 @@ def save_file(full_path: str, content: str):
         f.write(content)
 
 
-import subprocess
+# pastes that come in quicker than this end up in one commit
+COMMIT_DELAY = 1.5
+
 
+def _git(args, cwd):
+    subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
+    )
 
-def commit_file(folder_path: str, commit_text: str):
 
+def commit_file(folder_path: str, commit_text: str, files=None):
+    """Commit `files` (names inside the folder), or everything when None"""
     if not os.path.exists(os.path.join(folder_path, ".git")):
-        subprocess.run(["git", "init"], cwd=folder_path)
+        _git(["init"], folder_path)
+
+    paths = list(files) if files else ["."]
+    _git(["add", "--", *paths], folder_path)
+    _git(["commit", "-m", commit_text, "--", *paths], folder_path)
+
+
+async def save_file_async(full_path: str, content: str):
+    """save_file on a worker thread, keeps the event loop (and the UI) responsive"""
+    await asyncio.get_running_loop().run_in_executor(
+        None, save_file, full_path, content
+    )
+
+
+class CommitBatcher:
+    """
+    Collects saved files per folder and commits them together once no new
+    file came in for `delay` seconds. git runs on a worker thread.
+    """
+
+    def __init__(self, delay=COMMIT_DELAY):
+        self.delay = delay
+        self.pending = {}
+        self._timers = {}
+        # one git process at a time per batcher, they'd fight over index.lock
+        self._lock = asyncio.Lock()
 
-    subprocess.run(["git", "add", "."], cwd=folder_path)
-    subprocess.run(["git", "commit", "-m", commit_text], cwd=folder_path)
+    def add(self, folder_path: str, file_name: str):
+        self.pending.setdefault(folder_path, []).append(file_name)
+        timer = self._timers.get(folder_path)
+        if timer:
+            timer.cancel()
+        self._timers[folder_path] = asyncio.ensure_future(
+            self._commitLater(folder_path)
+        )
+
+    async def _commitLater(self, folder_path):
+        await asyncio.sleep(self.delay)
+        del self._timers[folder_path]
+        files = self.pending.pop(folder_path, [])
+        if not files:
+            return
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(
+                None, commit_file, folder_path, commitMessage(files), files
+            )
+
+    def flushNow(self):
+        """Commit everything still waiting right away, e.g. when the app closes"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for folder_path, files in self.pending.items():
+            commit_file(folder_path, commitMessage(files), files)
+        self.pending.clear()
+
+
+def commitMessage(files):
+    if len(files) == 1:
+        return f"Added a new file {files[0]}"
+    return f"Added {len(files)} new files\n\n" + "\n".join(files)
 
 
 def shortenPath(path: str, parts: int = 3) -> str:
@@ -35,3 +103,15 @@ def shortenPath(path: str, parts: int = 3) -> str:
     if len(split_path) > parts:
         return f"...{os.sep}" + os.sep.join(split_path[-parts:])
     return path
+
+
+def cacheDir(*parts: str) -> str:
+    """Per-user cache folder for save-code-x, created on first use"""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+
+    path = os.path.join(base, "save-code-x", *parts)
+    os.makedirs(path, exist_ok=True)
+    return path